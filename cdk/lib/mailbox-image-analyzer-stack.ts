@@ -39,6 +39,12 @@ export class MailboxImageAnalyzerStack extends cdk.Stack {
           noncurrentVersionExpiration: cdk.Duration.days(30),
           expiration: cdk.Duration.days(365), // Keep images for 1 year
         },
+        {
+          id: 'ExpireComparisonHistory',
+          enabled: true,
+          prefix: 'status/history/',
+          expiration: cdk.Duration.days(60), // Same retention as the statistics files
+        },
       ],
     });
 
@@ -162,6 +168,13 @@ export class MailboxImageAnalyzerStack extends cdk.Stack {
       description: 'Pillow library for image processing',
     });
 
+    // Create common utils layer (thumbnail_utils, aws_clients)
+    const commonUtilsLayer = new lambda.LayerVersion(this, 'CommonUtilsLayer', {
+      code: lambda.Code.fromAsset('../lambda/common-layer'),
+      compatibleRuntimes: [lambda.Runtime.PYTHON_3_11],
+      description: 'Common utilities (thumbnail_utils, aws_clients) for Lambda functions',
+    });
+
     // Create Lambda function for handling uploads
     const uploadFunction = new lambda.Function(this, 'UploadFunction', {
       runtime: lambda.Runtime.PYTHON_3_11,
@@ -169,7 +182,7 @@ export class MailboxImageAnalyzerStack extends cdk.Stack {
       code: lambda.Code.fromAsset('../lambda'),
       timeout: cdk.Duration.minutes(1),
       memorySize: 256,
-      layers: [pillowLayer],
+      layers: [pillowLayer, commonUtilsLayer],
       environment: {
         BUCKET_NAME: this.imageBucket.bucketName,
       },
@@ -178,13 +191,6 @@ export class MailboxImageAnalyzerStack extends cdk.Stack {
     // Grant S3 write permissions to upload function
     this.imageBucket.grantWrite(uploadFunction);
 
-    // Create common utils layer (thumbnail_utils)
-    const commonUtilsLayer = new lambda.LayerVersion(this, 'CommonUtilsLayer', {
-      code: lambda.Code.fromAsset('../lambda/common-layer'),
-      compatibleRuntimes: [lambda.Runtime.PYTHON_3_11],
-      description: 'Common utilities (thumbnail_utils) for image functions',
-    });
-
     // Create numpy layer for median image creation
     const numpyLayer = new lambda.LayerVersion(this, 'NumpyLayer', {
       code: lambda.Code.fromAsset('../lambda/numpy-layer'),
@@ -324,6 +330,7 @@ export class MailboxImageAnalyzerStack extends cdk.Stack {
       code: lambda.Code.fromAsset('../lambda'),
       timeout: cdk.Duration.minutes(5),
       memorySize: 512,
+      layers: [commonUtilsLayer],
       environment: {
         BUCKET_NAME: this.imageBucket.bucketName,
       },
@@ -344,8 +351,9 @@ export class MailboxImageAnalyzerStack extends cdk.Stack {
       },
     });
 
-    // Grant S3 read permissions to comparison status function
-    this.imageBucket.grantRead(getComparisonStatusFunction);
+    // Grant S3 read/write permissions to comparison status function (it folds
+    // status/history/ entries into the statistics files on read)
+    this.imageBucket.grantReadWrite(getComparisonStatusFunction);
 
     // Create Lambda function for median image creation
     const createMedianImageFunction = new lambda.Function(this, 'CreateMedianImageFunction', {
@@ -385,7 +393,7 @@ export class MailboxImageAnalyzerStack extends cdk.Stack {
       code: lambda.Code.fromAsset('../lambda'),
       timeout: cdk.Duration.minutes(5),
       memorySize: 1024,
-      layers: [pillowLayer, numpyLayer],
+      layers: [pillowLayer, numpyLayer, commonUtilsLayer],
       environment: {
         BUCKET_NAME: this.imageBucket.bucketName,
       },
@@ -439,6 +447,7 @@ export class MailboxImageAnalyzerStack extends cdk.Stack {
       code: lambda.Code.fromAsset('../lambda'),
       timeout: cdk.Duration.minutes(1),
       memorySize: 256,
+      layers: [commonUtilsLayer],
       environment: {
         BUCKET_NAME: this.imageBucket.bucketName,
       },
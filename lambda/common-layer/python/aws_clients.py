@@ -0,0 +1,14 @@
+import boto3
+from botocore.config import Config
+
+def make_s3_client(max_pool_connections=10):
+    """
+    Create an S3 client with adaptive retries and TCP keepalive, so warm invocations reuse
+    connections. Size max_pool_connections to the number of threads sharing the client;
+    the default suits single-threaded handlers.
+    """
+    return boto3.client('s3', config=Config(
+        max_pool_connections=max_pool_connections,
+        retries={'max_attempts': 3, 'mode': 'adaptive'},
+        tcp_keepalive=True
+    ))
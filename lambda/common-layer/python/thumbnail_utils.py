@@ -1,10 +1,12 @@
-import boto3
 import json
 import os
+from aws_clients import make_s3_client
 from PIL import Image
 import io
 
-s3_client = boto3.client('s3')
+# Callers create thumbnails on up to THUMBNAIL_WORKERS threads (thumbnail_sync)
+THUMBNAIL_WORKERS = 32
+s3_client = make_s3_client(max_pool_connections=THUMBNAIL_WORKERS)
 
 def create_thumbnail(bucket_name, source_key, thumbnail_key):
     """
@@ -33,21 +35,33 @@ def create_thumbnail(bucket_name, source_key, thumbnail_key):
         width, height = image.size
         new_width = 256
         new_height = int((height * new_width) / width)
+
+        if width > new_width:
+            # Shrink in place; thumbnail() drafts the JPEG decode down to reducing_gap x the
+            # target size and then does a two-step reduce + LANCZOS resample
+            image.thumbnail((new_width, new_height), Image.Resampling.LANCZOS, reducing_gap=2.0)
+            new_width, new_height = image.size
+        else:
+            # thumbnail() never enlarges, so sources at most 256px wide keep the plain
+            # resize and are scaled up to the fixed gallery width as before
+            image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
         
-        # Resize image
-        thumbnail = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        
-        # Convert thumbnail to bytes
+        # Convert thumbnail to bytes (4:2:0, optimized Huffman tables, progressive); a thumbnail
+        # is written once and fetched by every gallery view, so bytes matter more than encode time
         thumbnail_buffer = io.BytesIO()
-        thumbnail.save(thumbnail_buffer, format='JPEG', quality=85)
-        thumbnail_bytes = thumbnail_buffer.getvalue()
+        image.save(thumbnail_buffer, format='JPEG', quality=75, optimize=True, progressive=True, subsampling=2)
+        thumbnail_buffer.seek(0)
         
-        # Upload thumbnail
+        # Upload thumbnail (pass the buffer itself to avoid a getvalue() copy, and its
+        # length so botocore does not have to seek around to measure it)
         s3_client.put_object(
             Bucket=bucket_name,
             Key=thumbnail_key,
-            Body=thumbnail_bytes,
-            ContentType='image/jpeg'
+            Body=thumbnail_buffer,
+            ContentLength=thumbnail_buffer.getbuffer().nbytes,
+            ContentType='image/jpeg',
+            # Lets thumbnail_sync tell whether the source has changed since
+            Metadata={'source-etag': response['ETag'].strip('"')}
         )
         
         return {
@@ -4,48 +4,67 @@ import logging
 import os
 from datetime import datetime, timezone
 import numpy as np
-from PIL import Image
-import io
 from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
 from model_a import modelA_comparison, save_modelA_result
 from model_b import modelB_comparison, save_modelB_result
 from model_c import modelC_comparison, save_modelC_result
 from model_d import modelD_comparison, save_modelD_result
+from model_common import cached_median, cache_median, decode_gray, prepare, abs_diff
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 s3_client = boto3.client('s3')
 
-def run_comparison_model(model_name, latest_image, median_image, latest_image_key, median_image_key, bucket_name=None):
+def fetch_object(bucket_name, key):
+    """
+    Download an object and return its bytes
+    """
+    logger.info(f"Downloading {key}")
+    response = s3_client.get_object(Bucket=bucket_name, Key=key)
+    return response['Body'].read()
+
+def fetch_pair(bucket_name, first_key, second_key):
+    """
+    Download two objects concurrently; both GETs are S3 round-trip bound
+    Returns (first_bytes, second_bytes)
+    """
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first_future = executor.submit(fetch_object, bucket_name, first_key)
+        second_future = executor.submit(fetch_object, bucket_name, second_key)
+        return first_future.result(), second_future.result()
+
+def run_comparison_model(model_name, latest_image, median_image, latest_image_key, median_image_key, bucket_name=None, timestamp=None, prepared=None):
     """
     Run comparison using the specified model
+    prepared is the (latest_array, median_array, diff_array) shared by models A and B
     """
     if model_name == 'ModelA':
-        return modelA_comparison(latest_image, median_image, latest_image_key, median_image_key, bucket_name)
+        return modelA_comparison(latest_image, median_image, latest_image_key, median_image_key, bucket_name, timestamp, prepared)
     elif model_name == 'ModelB':
-        return modelB_comparison(latest_image, median_image, latest_image_key, median_image_key, bucket_name)
+        return modelB_comparison(latest_image, median_image, latest_image_key, median_image_key, bucket_name, timestamp, prepared)
     elif model_name == 'ModelC':
-        return modelC_comparison(latest_image, median_image, latest_image_key, median_image_key, bucket_name)
+        return modelC_comparison(latest_image, median_image, latest_image_key, median_image_key, bucket_name, timestamp)
     elif model_name == 'ModelD':
         if bucket_name is None:
             raise ValueError("bucket_name is required for ModelD")
-        return modelD_comparison(latest_image, median_image, latest_image_key, median_image_key, bucket_name)
+        return modelD_comparison(latest_image, median_image, latest_image_key, median_image_key, bucket_name, timestamp)
     else:
         raise ValueError(f"Unknown model: {model_name}")
 
-def save_comparison_result(bucket_name, model_name, comparison_result, latest_image_key, median_image_key):
+def save_comparison_result(bucket_name, model_name, comparison_result, latest_image_key, median_image_key, timestamp=None):
     """
     Save comparison result to model-specific files
     """
     # Use the specialized save function for each model
     if model_name == 'ModelA':
-        return save_modelA_result(bucket_name, comparison_result, latest_image_key, median_image_key)
+        return save_modelA_result(bucket_name, comparison_result, latest_image_key, median_image_key, timestamp)
     elif model_name == 'ModelB':
-        return save_modelB_result(bucket_name, comparison_result, latest_image_key, median_image_key)
+        return save_modelB_result(bucket_name, comparison_result, latest_image_key, median_image_key, timestamp)
     elif model_name == 'ModelC':
-        return save_modelC_result(bucket_name, comparison_result, latest_image_key, median_image_key)
+        return save_modelC_result(bucket_name, comparison_result, latest_image_key, median_image_key, timestamp)
     elif model_name == 'ModelD':
-        return save_modelD_result(bucket_name, comparison_result, latest_image_key, median_image_key)
+        return save_modelD_result(bucket_name, comparison_result, latest_image_key, median_image_key, timestamp)
     else:
         raise ValueError(f"Unknown model: {model_name}")
 
@@ -55,10 +74,12 @@ def handler(event, context):
         latest_image_key = 'uploads/latest.jpg'
         median_image_key = 'median-image/median.jpg'
         
-        # Get model name from event or default to ModelA
-        model_name = event.get('model_name', 'ModelA')
+        # Get model names from event: a 'model_names' batch shares one download, decode and
+        # preprocessing pass; a single 'model_name' (default ModelA) keeps the original response
+        batched = 'model_names' in event
+        model_names = event['model_names'] if batched else [event.get('model_name', 'ModelA')]
         
-        logger.info(f"Starting {model_name} comparison of latest.jpg with median image")
+        logger.info(f"Starting {', '.join(model_names)} comparison of latest.jpg with median image")
         
         # Check if latest.jpg exists
         try:
@@ -77,9 +98,9 @@ def handler(event, context):
             else:
                 raise e
         
-        # Check if median image exists
+        # Check if median image exists (its ETag keys the warm-container median cache)
         try:
-            s3_client.head_object(Bucket=bucket_name, Key=median_image_key)
+            median_head = s3_client.head_object(Bucket=bucket_name, Key=median_image_key)
         except ClientError as e:
             if e.response['Error']['Code'] == '404':
                 logger.warning("median.jpg not found")
@@ -94,28 +115,62 @@ def handler(event, context):
             else:
                 raise e
         
-        # Download latest image
-        logger.info("Downloading latest.jpg")
-        latest_response = s3_client.get_object(Bucket=bucket_name, Key=latest_image_key)
-        latest_data = latest_response['Body'].read()
-        latest_image = Image.open(io.BytesIO(latest_data))
+        # Download latest image, and the median image unless this container already
+        # holds the current version; on a miss both are fetched concurrently
+        median_image = cached_median(bucket_name, median_image_key, median_head['ETag'])
+        if median_image is None:
+            latest_data, median_data = fetch_pair(bucket_name, latest_image_key, median_image_key)
+            median_image = cache_median(bucket_name, median_image_key, median_head['ETag'], decode_gray(median_data))
+        else:
+            latest_data = fetch_object(bucket_name, latest_image_key)
         
-        # Download median image
-        logger.info("Downloading median.jpg")
-        median_response = s3_client.get_object(Bucket=bucket_name, Key=median_image_key)
-        median_data = median_response['Body'].read()
-        median_image = Image.open(io.BytesIO(median_data))
+        # Every model works on grayscale at the median's size, so decode straight to that
+        latest_image = decode_gray(latest_data, median_image.size)
         
-        # Run comparison using specified model
-        comparison_result = run_comparison_model(model_name, latest_image, median_image, latest_image_key, median_image_key, bucket_name)
+        # One timestamp for every output of this run, so batched models line up exactly
+        timestamp = datetime.now(timezone.utc).isoformat()
         
-        # Save results to model-specific files
-        final_result = save_comparison_result(bucket_name, model_name, comparison_result, latest_image_key, median_image_key)
+        # Models A and B compare the same grayscale pair, so prepare it and take the difference
+        # once for both (C and D adjust brightness first and prepare their own)
+        prepared = None
+        if 'ModelA' in model_names or 'ModelB' in model_names:
+            latest_array, median_array = prepare(latest_image, median_image)
+            prepared = (latest_array, median_array, abs_diff(latest_array, median_array))
         
-        difference_percentage = comparison_result['difference_percentage']
-        has_mail = comparison_result['has_mail']
+        results = {}
+        errors = {}
+        for model_name in model_names:
+            try:
+                # Run comparison using specified model
+                comparison_result = run_comparison_model(model_name, latest_image, median_image, latest_image_key, median_image_key, bucket_name, timestamp, prepared)
+                
+                # Save results to model-specific files
+                final_result = save_comparison_result(bucket_name, model_name, comparison_result, latest_image_key, median_image_key, timestamp)
+            except Exception as e:
+                if not batched:
+                    raise e
+                # One failing model should not cost the rest of the batch their results
+                logger.error(f"{model_name} comparison failed: {str(e)}")
+                errors[model_name] = str(e)
+                continue
+            
+            difference_percentage = comparison_result['difference_percentage']
+            has_mail = comparison_result['has_mail']
+            
+            logger.info(f"{model_name} comparison completed: {difference_percentage:.2f}% difference, has_mail: {has_mail}")
+            results[model_name] = final_result
         
-        logger.info(f"{model_name} comparison completed: {difference_percentage:.2f}% difference, has_mail: {has_mail}")
+        if batched:
+            return {
+                'statusCode': 200,
+                'body': json.dumps({
+                    'success': not errors,
+                    'model_names': model_names,
+                    'comparisons': results,
+                    'errors': errors,
+                    'message': f'{len(results)} of {len(model_names)} comparisons completed'
+                })
+            }
         
         return {
             'statusCode': 200,
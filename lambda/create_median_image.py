@@ -102,13 +102,15 @@ def handler(event, context):
                 })
             }
             
-        # Download and process images
-        image_arrays = []
-        image_sizes = []
+        # Download and process images straight into one preallocated uint8 stack
+        # Use the same size as the source images (1024x541)
+        target_size = (1024, 541)  # Match source image dimensions
+        image_stack = np.empty((len(latest_images), target_size[1], target_size[0], 3), dtype=np.uint8)
+        num_processed = 0
         
         for i, obj in enumerate(latest_images):
             try:
-                logger.info(f"Processing image {i+1}/{len(latest_images)}: {obj['Key']}")
+                logger.debug("Processing image %d/%d: %s", i + 1, len(latest_images), obj['Key'])
                 
                 # Add file info to log
                 log_data['files_used'].append({
@@ -118,34 +120,31 @@ def handler(event, context):
                     'processing_order': i + 1
                 })
                 
-                # Download image from S3
+                # Download image from S3 and decode straight from the response stream,
+                # forcing the full decode before the body is released
                 response = s3_client.get_object(Bucket=bucket_name, Key=obj['Key'])
-                image_data = response['Body'].read()
-                
-                # Open with PIL
-                image = Image.open(io.BytesIO(image_data))
+                image = Image.open(response['Body'])
+                image.load()
                 
                 # Convert to RGB if necessary
                 if image.mode != 'RGB':
                     image = image.convert('RGB')
                 
                 # Resize to a standard size for consistent processing
-                # Use the same size as the source images (1024x541)
-                target_size = (1024, 541)  # Match source image dimensions
                 image = image.resize(target_size, Image.Resampling.LANCZOS)
                 
-                # Convert to numpy array
-                img_array = np.array(image)
-                image_arrays.append(img_array)
-                image_sizes.append(img_array.shape)
+                # Copy pixels into the next free slot of the stack
+                img_array = image_stack[num_processed]
+                img_array[...] = np.asarray(image)
+                num_processed += 1
                 
-                logger.info(f"Successfully processed image {i+1}: {img_array.shape}")
+                logger.debug("Successfully processed image %d: %s", i + 1, img_array.shape)
                 
             except Exception as e:
                 logger.error(f"Error processing image {obj['Key']}: {str(e)}")
                 continue
         
-        if len(image_arrays) < 3:
+        if num_processed < 3:
             logger.error("Not enough successfully processed images to create median")
             return {
                 'statusCode': 500,
@@ -156,15 +155,17 @@ def handler(event, context):
             }
         
         # Create median image
-        logger.info(f"Creating median from {len(image_arrays)} images")
-        median_array = np.median(image_arrays, axis=0).astype(np.uint8)
+        # Partition the uint8 stack in place instead of letting np.median copy it
+        logger.info(f"Creating median from {num_processed} images")
+        median_array = np.median(image_stack[:num_processed], axis=0, overwrite_input=True).astype(np.uint8)
         
         # Convert back to PIL Image
         median_image = Image.fromarray(median_array)
         
-        # Save to bytes
+        # Save to bytes (4:2:2 chroma, skip the two-pass optimize step)
         img_buffer = io.BytesIO()
-        median_image.save(img_buffer, format='JPEG', quality=85)
+        median_image.save(img_buffer, format='JPEG', quality=85, subsampling=1, optimize=False)
+        median_image_size = img_buffer.tell()
         img_buffer.seek(0)
         
         # Upload to S3
@@ -174,21 +175,21 @@ def handler(event, context):
         s3_client.put_object(
             Bucket=bucket_name,
             Key=target_key,
-            Body=img_buffer.getvalue(),
+            Body=img_buffer,
             ContentType='image/jpeg',
             CacheControl='no-cache, no-store, must-revalidate',
             Expires='0',
             Metadata={
                 'created_at': datetime.now(timezone.utc).isoformat(),
-                'source_images': str(len(image_arrays)),
+                'source_images': str(num_processed),
                 'source_folders': ','.join(source_folders)
             }
         )
         
         # Update log data with final results
-        log_data['num_images_processed'] = len(image_arrays)
+        log_data['num_images_processed'] = num_processed
         log_data['median_image_key'] = target_key
-        log_data['median_image_size'] = len(img_buffer.getvalue())
+        log_data['median_image_size'] = median_image_size
         
         # Save log file to S3
         log_key = f"{target_folder}/log.json"
@@ -212,10 +213,10 @@ def handler(event, context):
             'statusCode': 200,
             'body': json.dumps({
                 'success': True,
-                'message': f'Successfully created median image from {len(image_arrays)} images',
+                'message': f'Successfully created median image from {num_processed} images',
                 'medianCreated': True,
                 'targetKey': target_key,
-                'sourceImages': len(image_arrays)
+                'sourceImages': num_processed
             })
         }
         
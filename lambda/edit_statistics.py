@@ -1,9 +1,24 @@
-import boto3
 import json
 import os
+from botocore.exceptions import ClientError
 from datetime import datetime, timezone
+from statistics_store import consolidate, write_statistics, history_prefix, is_write_conflict
+
+_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type',
+    'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
+}
+
+
+def _response(status_code, body):
+    return {
+        'statusCode': status_code,
+        'headers': _HEADERS,
+        'body': body if isinstance(body, str) else json.dumps(body)
+    }
 
-s3_client = boto3.client('s3')
 
 def handler(event, context):
     try:
@@ -20,48 +35,19 @@ def handler(event, context):
         # Validate model parameter
         allowed_models = ['modela', 'modelb', 'modelc', 'modeld']
         if model_name not in allowed_models:
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*',
-                    'Access-Control-Allow-Headers': 'Content-Type',
-                    'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
-                },
-                'body': json.dumps({'error': 'Invalid model parameter. Must be "modela", "modelb", "modelc", or "modeld"'})
-            }
+            return _response(400, {'error': 'Invalid model parameter. Must be "modela", "modelb", "modelc", or "modeld"'})
         
-        # Construct the statistics file key
-        statistics_key = f'status/statistics-{model_name}.json'
+        # Canonical model name ('modela' -> 'ModelA') used in the statistics file
+        model_display_name = 'Model' + model_name[-1].upper()
         
         if http_method == 'GET':
-            # Fetch the statistics JSON file
-            try:
-                response = s3_client.get_object(Bucket=bucket_name, Key=statistics_key)
-                content = response['Body'].read().decode('utf-8')
-                
-                return {
-                    'statusCode': 200,
-                    'headers': {
-                        'Content-Type': 'application/json',
-                        'Access-Control-Allow-Origin': '*',
-                        'Access-Control-Allow-Headers': 'Content-Type',
-                        'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
-                    },
-                    'body': content
-                }
-            except s3_client.exceptions.NoSuchKey:
+            # Fetch the statistics JSON, folding in comparisons recorded since the last read
+            statistics_data, _, _ = consolidate(bucket_name, model_display_name)
+            if statistics_data is None:
                 # File doesn't exist, return empty array
-                return {
-                    'statusCode': 200,
-                    'headers': {
-                        'Content-Type': 'application/json',
-                        'Access-Control-Allow-Origin': '*',
-                        'Access-Control-Allow-Headers': 'Content-Type',
-                        'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
-                    },
-                    'body': json.dumps([])
-                }
+                return _response(200, [])
+            
+            return _response(200, statistics_data)
         
         elif http_method == 'POST':
             # Save the statistics JSON file
@@ -69,16 +55,7 @@ def handler(event, context):
                 # Parse the request body
                 body = event.get('body', '')
                 if not body:
-                    return {
-                        'statusCode': 400,
-                        'headers': {
-                            'Content-Type': 'application/json',
-                            'Access-Control-Allow-Origin': '*',
-                            'Access-Control-Allow-Headers': 'Content-Type',
-                            'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
-                        },
-                        'body': json.dumps({'error': 'No body provided'})
-                    }
+                    return _response(400, {'error': 'No body provided'})
                 
                                 # Validate JSON
                 try:
@@ -92,97 +69,53 @@ def handler(event, context):
                         # Object format with comparisons array - extract the array
                         comparisons_array = data['comparisons']
                         if not isinstance(comparisons_array, list):
-                            return {
-                                'statusCode': 400,
-                                'headers': {
-                                    'Content-Type': 'application/json',
-                                    'Access-Control-Allow-Origin': '*',
-                                    'Access-Control-Allow-Headers': 'Content-Type',
-                                    'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
-                                },
-                                'body': json.dumps({'error': 'Data must be a JSON array or object with comparisons array'})
-                            }
+                            return _response(400, {'error': 'Data must be a JSON array or object with comparisons array'})
                     else:
-                        return {
-                            'statusCode': 400,
-                            'headers': {
-                                'Content-Type': 'application/json',
-                                'Access-Control-Allow-Origin': '*',
-                                'Access-Control-Allow-Headers': 'Content-Type',
-                                'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
-                            },
-                            'body': json.dumps({'error': 'Data must be a JSON array or object with comparisons array'})
-                        }
+                        return _response(400, {'error': 'Data must be a JSON array or object with comparisons array'})
                 except json.JSONDecodeError:
-                    return {
-                        'statusCode': 400,
-                        'headers': {
-                            'Content-Type': 'application/json',
-                            'Access-Control-Allow-Origin': '*',
-                            'Access-Control-Allow-Headers': 'Content-Type',
-                            'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
-                        },
-                        'body': json.dumps({'error': 'Invalid JSON format'})
-                    }
+                    return _response(400, {'error': 'Invalid JSON format'})
+                
+                # Every entry needs its timestamp: the store orders, trims and deduplicates by it
+                if not all(isinstance(c, dict) and isinstance(c.get('timestamp'), str) for c in comparisons_array):
+                    return _response(400, {'error': 'Every comparison must be an object with a string timestamp'})
                 
-                # Save to S3
-                s3_client.put_object(
-                    Bucket=bucket_name,
-                    Key=statistics_key,
-                    Body=json.dumps(data, indent=2),  # Save the original format
-                    ContentType='application/json',
-                    Metadata={
+                # Fold pending history first so the edited file keeps the current cursor
+                # and already-folded comparisons are not added back on the next read
+                current_data, cursor, etag = consolidate(bucket_name, model_display_name)
+                
+                # Comparisons recorded while the editor was open are newer than anything in
+                # the edited copy; carry over the ones already folded (at or before the cursor).
+                # Entries still settling stay in the history and are folded on a later read,
+                # so the cursor is kept as consolidate() left it and never passes one in flight
+                if comparisons_array and current_data and cursor:
+                    prefix = history_prefix(model_display_name)
+                    current_comparisons = current_data if isinstance(current_data, list) else current_data.get('comparisons', [])
+                    newest_edited = max(c.get('timestamp', '') for c in comparisons_array)
+                    comparisons_array.extend(c for c in current_comparisons
+                                             if newest_edited < c['timestamp'] and f"{prefix}{c['timestamp']}.json" <= cursor)
+                
+                # Save to S3, only over the version folded above: a status read that folds
+                # in between makes this a conflict instead of being silently overwritten
+                try:
+                    write_statistics(bucket_name, model_display_name, data, cursor, etag, {  # Save the original format
                         'last_modified': datetime.now(timezone.utc).isoformat(),
                         'model': model_name
-                    }
-                )
-                
-                return {
-                    'statusCode': 200,
-                    'headers': {
-                        'Content-Type': 'application/json',
-                        'Access-Control-Allow-Origin': '*',
-                        'Access-Control-Allow-Headers': 'Content-Type',
-                        'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
-                    },
-                    'body': json.dumps({
-                        'message': f'Statistics for {model_name} saved successfully',
-                        'timestamp': datetime.now(timezone.utc).isoformat()
                     })
-                }
+                except ClientError as e:
+                    if not is_write_conflict(e):
+                        raise e
+                    return _response(409, {'error': 'Statistics changed while saving; please try again'})
+                
+                return _response(200, {
+                    'message': f'Statistics for {model_name} saved successfully',
+                    'timestamp': datetime.now(timezone.utc).isoformat()
+                })
                 
             except Exception as e:
-                return {
-                    'statusCode': 500,
-                    'headers': {
-                        'Content-Type': 'application/json',
-                        'Access-Control-Allow-Origin': '*',
-                        'Access-Control-Allow-Headers': 'Content-Type',
-                        'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
-                    },
-                    'body': json.dumps({'error': f'Failed to save statistics: {str(e)}'})
-                }
+                return _response(500, {'error': f'Failed to save statistics: {str(e)}'})
         
         else:
-            return {
-                'statusCode': 405,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*',
-                    'Access-Control-Allow-Headers': 'Content-Type',
-                    'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
-                },
-                'body': json.dumps({'error': 'Method not allowed'})
-            }
+            return _response(405, {'error': 'Method not allowed'})
         
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
-            },
-            'body': json.dumps({'error': str(e)})
-        }
+        return _response(500, {'error': str(e)})
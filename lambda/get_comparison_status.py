@@ -3,6 +3,7 @@ import boto3
 import logging
 import os
 from botocore.exceptions import ClientError
+from statistics_store import consolidate
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -19,7 +20,6 @@ def handler(event, context):
         
         # Use model-specific file names
         latest_compare_key = f'status/{model_name.lower()}.json'
-        statistics_key = f'status/statistics-{model_name.lower()}.json'
         
         # Get latest comparison
         try:
@@ -31,20 +31,15 @@ def handler(event, context):
             else:
                 raise e
         
-        # Get statistics
-        try:
-            statistics_response = s3_client.get_object(Bucket=bucket_name, Key=statistics_key)
-            statistics_data = json.loads(statistics_response['Body'].read())
-        except ClientError as e:
-            if e.response['Error']['Code'] == 'NoSuchKey':
-                statistics_data = {
-                    'model_name': model_name,
-                    'total_comparisons': 0,
-                    'last_updated': None,
-                    'comparisons': []
-                }
-            else:
-                raise e
+        # Get statistics, folding in any comparisons recorded since the last read
+        statistics_data, _, _ = consolidate(bucket_name, model_name)
+        if statistics_data is None:
+            statistics_data = {
+                'model_name': model_name,
+                'total_comparisons': 0,
+                'last_updated': None,
+                'comparisons': []
+            }
         
         result = {
             'success': True,
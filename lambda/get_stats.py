@@ -1,9 +1,25 @@
 import boto3
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 s3_client = boto3.client('s3')
 
+def count_images(bucket_name, folder):
+    """Count .jpg files (excluding thumbnails) under a folder, following pagination"""
+    try:
+        count = 0
+        paginator = s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=folder + '/'):
+            for obj in page.get('Contents', []):
+                key = obj['Key']
+                if key.endswith('.jpg') and not key.endswith('-thumbnail.jpg'):
+                    count += 1
+        return count
+    except Exception as e:
+        print(f"Error getting count for {folder}: {str(e)}")
+        return 0
+
 def handler(event, context):
     try:
         # Get bucket name from environment variable
@@ -19,29 +35,11 @@ def handler(event, context):
             'ai-training-data/test/with-mail', 
             'ai-training-data/test/without-mail'
         ]
-        stats = {}
         
-        for folder in folders:
-            try:
-                response = s3_client.list_objects_v2(
-                    Bucket=bucket_name,
-                    Prefix=folder + '/',
-                    MaxKeys=1000
-                )
-                
-                # Count only .jpg files (excluding thumbnails)
-                count = 0
-                if 'Contents' in response:
-                    for obj in response['Contents']:
-                        key = obj['Key']
-                        if key.endswith('.jpg') and not key.endswith('-thumbnail.jpg'):
-                            count += 1
-                
-                stats[folder] = count
-                
-            except Exception as e:
-                print(f"Error getting count for {folder}: {str(e)}")
-                stats[folder] = 0
+        # List all folders concurrently; each listing is a chain of S3 round-trips
+        with ThreadPoolExecutor(max_workers=len(folders)) as executor:
+            counts = executor.map(lambda folder: count_images(bucket_name, folder), folders)
+            stats = dict(zip(folders, counts))
         
         return {
             'statusCode': 200,
@@ -21,23 +21,23 @@ def handler(event, context):
         # Get the current timestamp for filename
         timestamp = now.strftime('%Y-%m-%d-%H-%M')
         
-        # Invoke comparison functions for all models asynchronously (always run, regardless of time)
+        # Invoke the comparison function once for all models asynchronously (always run, regardless of time);
+        # the batch shares one download, decode and preprocessing pass
         models = ['ModelA', 'ModelB', 'ModelC', 'ModelD']  # All available models including ModelD - Updated
-        for model_name in models:
-            try:
-                lambda_client.invoke(
-                    FunctionName=os.environ.get('COMPARISON_FUNCTION_NAME'),
-                    InvocationType='Event',  # Asynchronous invocation
-                    Payload=json.dumps({
-                        'triggered_by': 'image_processor',
-                        'timestamp': timestamp,
-                        'model_name': model_name
-                    })
-                )
-                print(f"Comparison function invoked successfully for {model_name}")
-            except Exception as e:
-                print(f"Error invoking comparison function for {model_name}: {str(e)}")
-                # Don't fail the main function if comparison fails
+        try:
+            lambda_client.invoke(
+                FunctionName=os.environ.get('COMPARISON_FUNCTION_NAME'),
+                InvocationType='Event',  # Asynchronous invocation
+                Payload=json.dumps({
+                    'triggered_by': 'image_processor',
+                    'timestamp': timestamp,
+                    'model_names': models
+                })
+            )
+            print(f"Comparison function invoked successfully for {', '.join(models)}")
+        except Exception as e:
+            print(f"Error invoking comparison function: {str(e)}")
+            # Don't fail the main function if comparison fails
         
         # Check if current minute is between 55-59 or 00-04
         if not (current_minute >= 55 or current_minute <= 4):
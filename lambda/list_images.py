@@ -1,10 +1,20 @@
 import boto3
 import json
 import os
+import re
 from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 
 s3_client = boto3.client('s3')
 
+# Filenames start with a YYYY-MM-DD-HH-MM capture time
+_DATE_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})-(\d{2})-(\d{2})')
+
+def list_all(bucket_name, prefix):
+    """Return every object under a prefix, following pagination"""
+    paginator = s3_client.get_paginator('list_objects_v2')
+    return [obj for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix) for obj in page.get('Contents', [])]
+
 def handler(event, context):
     try:
         # Get bucket name from environment variable
@@ -39,47 +49,42 @@ def handler(event, context):
                 'body': json.dumps({'error': 'Invalid folder parameter'})
             }
         
-        # List objects in the specified folder
-        response = s3_client.list_objects_v2(
-            Bucket=bucket_name,
-            Prefix=folder + '/',
-            MaxKeys=1000
-        )
+        # List the folder and the thumbnails concurrently; both are S3 round-trip bound
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            folder_future = executor.submit(list_all, bucket_name, folder + '/')
+            thumbnails_future = executor.submit(list_all, bucket_name, 'thumbnails/')
+            folder_objects = folder_future.result()
+            thumbnail_keys = {obj['Key'] for obj in thumbnails_future.result()}
         
         images = []
-        if 'Contents' in response:
-            for obj in response['Contents']:
-                key = obj['Key']
-                if key.endswith('.jpg') and not key.endswith('-thumbnail.jpg'):
-                    # Extract filename without folder path
-                    filename = key.split('/')[-1]
-                    base_name = filename.replace('.jpg', '')
-                    
-                    # Check if thumbnail actually exists
+        for obj in folder_objects:
+            key = obj['Key']
+            if key.endswith('.jpg') and not key.endswith('-thumbnail.jpg'):
+                # Extract filename without folder path
+                filename = key.split('/')[-1]
+                base_name = filename.replace('.jpg', '')
+                
+                # Check if thumbnail actually exists
+                thumbnail_key = f'thumbnails/{base_name}-thumbnail.jpg'
+                if thumbnail_key not in thumbnail_keys:
                     thumbnail_key = None
-                    try:
-                        s3_client.head_object(Bucket=bucket_name, Key=f'thumbnails/{base_name}-thumbnail.jpg')
-                        thumbnail_key = f'thumbnails/{base_name}-thumbnail.jpg'
-                    except:
-                        # No thumbnail exists, set to None
-                        thumbnail_key = None
-                    
-                    # Extract date from filename (YYYY-MM-DD-HH-MM format)
-                    date_obj = extract_date_from_filename(base_name)
-                    
-                    # If filename parsing fails, use S3 LastModified as fallback
-                    fallback_date = obj.get('LastModified')
-                    if fallback_date:
-                        fallback_date = fallback_date.replace(tzinfo=timezone.utc)
-                    
-                    images.append({
-                        'original': key,
-                        'thumbnail': thumbnail_key,
-                        'name': base_name,
-                        'date': date_obj.isoformat() if date_obj else (fallback_date.isoformat() if fallback_date else None),
-                        'size': obj.get('Size', 0),
-                        'lastModified': obj.get('LastModified', '').isoformat() if obj.get('LastModified') else None
-                    })
+                
+                # Extract date from filename (YYYY-MM-DD-HH-MM format)
+                date_obj = extract_date_from_filename(base_name)
+                
+                # If filename parsing fails, use S3 LastModified as fallback
+                fallback_date = obj.get('LastModified')
+                if fallback_date:
+                    fallback_date = fallback_date.replace(tzinfo=timezone.utc)
+                
+                images.append({
+                    'original': key,
+                    'thumbnail': thumbnail_key,
+                    'name': base_name,
+                    'date': date_obj.isoformat() if date_obj else (fallback_date.isoformat() if fallback_date else None),
+                    'size': obj.get('Size', 0),
+                    'lastModified': obj.get('LastModified', '').isoformat() if obj.get('LastModified') else None
+                })
         
         # Sort by date (newest first)
         images.sort(key=lambda x: x['date'] or '', reverse=True)
@@ -96,7 +101,7 @@ def handler(event, context):
                 'images': images,
                 'folder': folder,
                 'count': len(images)
-            })
+            }, separators=(',', ':'))
         }
         
     except Exception as e:
@@ -113,14 +118,11 @@ def handler(event, context):
 
 def extract_date_from_filename(filename):
     """Extract date from filename like '2025-08-31-17-35' and return as UTC datetime"""
+    match = _DATE_RE.match(filename)
+    if not match:
+        return None
     try:
-        import re
-        match = re.match(r'(\d{4}-\d{2}-\d{2}-\d{2}-\d{2})', filename)
-        if match:
-            date_str = match.group(1)
-            year, month, day, hour, minute = map(int, date_str.split('-'))
-            # Create UTC datetime object
-            return datetime(year, month, day, hour, minute, tzinfo=timezone.utc)
-    except:
-        pass
-    return None
+        return datetime(*map(int, match.groups()), tzinfo=timezone.utc)
+    except ValueError:
+        # Matched the shape but not a real date/time (e.g. month 13)
+        return None
@@ -3,76 +3,53 @@ import boto3
 import logging
 import os
 from datetime import datetime, timezone
-import numpy as np
-from PIL import Image, ImageFilter
-import io
-from botocore.exceptions import ClientError
+from statistics_store import append_comparison, JSON_SEPARATORS
+from model_common import prepare, diff_and_mark, encode_jpeg
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 s3_client = boto3.client('s3')
 
-def modelB_comparison(latest_image, median_image, latest_image_key, median_image_key, bucket_name):
+def modelB_comparison(latest_image, median_image, latest_image_key, median_image_key, bucket_name, timestamp=None, prepared=None):
     """
     Model B: Exactly like Model A but with threshold 20 instead of 10
     """
-    logger.info("ModelB: Starting pixel-based comparison with threshold 20")
+    if timestamp is None:
+        timestamp = datetime.now(timezone.utc).isoformat()
     
-    # Convert to grayscale if not already
-    if latest_image.mode != 'L':
-        latest_image = latest_image.convert('L')
-    if median_image.mode != 'L':
-        median_image = median_image.convert('L')
+    logger.info("ModelB: Starting pixel-based comparison with threshold 20")
     
-    # Only resize latest image if it's different size than median image
-    if latest_image.size != median_image.size:
-        logger.info(f"ModelB: Resizing latest image from {latest_image.size} to {median_image.size}")
-        latest_image = latest_image.resize(median_image.size, Image.Resampling.LANCZOS)
+    # Grayscale, size-match and view both images as uint8 (shared with the other models);
+    # a batched run hands in (latest_array, median_array, diff_array) computed once for A and B
+    if prepared is None:
+        latest_array, median_array = prepare(latest_image, median_image)
+        diff_array = None
     else:
-        logger.info(f"ModelB: Images already same size: {latest_image.size}")
-    
+        latest_array, median_array, diff_array = prepared
     target_size = median_image.size
     
-    # Convert to numpy arrays
-    latest_array = np.array(latest_image, dtype=np.float32)
-    median_array = np.array(median_image, dtype=np.float32)
-    
     # Calculate difference
     logger.info("ModelB: Calculating pixel differences with threshold 20")
-    diff_array = np.abs(latest_array - median_array)
+    # Difference, threshold (20) and yellow marking in one shared kernel
+    different_pixels, vis_array = diff_and_mark(latest_array, median_array, 20, diff_array)
     
-    # Calculate percentage difference with threshold 20
+    # Calculate percentage difference
     total_pixels = latest_array.size
-    different_pixels = np.sum(diff_array > 20)  # Threshold of 20 for significant difference
     difference_percentage = (different_pixels / total_pixels) * 100
     
-    # Create visualization image with yellow pixels for differences
-    # Convert grayscale back to RGB for yellow marking
-    visualization_image = latest_image.convert('RGB')
-    vis_array = np.array(visualization_image)
-    
-    # Mark different pixels as pure yellow (255, 255, 0)
-    diff_mask = diff_array > 20
-    vis_array[diff_mask] = [255, 255, 0]  # Pure yellow
-    
-    # Convert back to PIL Image
-    visualization_image = Image.fromarray(vis_array, 'RGB')
-    
     # Save the visualization image with yellow pixels to S3
     try:
-        output_buffer = io.BytesIO()
-        visualization_image.save(output_buffer, format='JPEG', quality=95)
-        visualization_bytes = output_buffer.getvalue()
+        visualization_buffer = encode_jpeg(vis_array, quality=95)
         
         # Save visualization to S3
         modelb_image_key = 'status/modelB.jpg'
         s3_client.put_object(
             Bucket=bucket_name,
             Key=modelb_image_key,
-            Body=visualization_bytes,
+            Body=visualization_buffer,
             ContentType='image/jpeg',
             Metadata={
-                'created_at': datetime.now(timezone.utc).isoformat(),
+                'created_at': timestamp,
                 'model': 'ModelB',
                 'different_pixels': str(different_pixels),
                 'total_pixels': str(total_pixels)
@@ -98,12 +75,13 @@ def modelB_comparison(latest_image, median_image, latest_image_key, median_image
         'visualization_saved': True
     }
 
-def save_modelB_result(bucket_name, comparison_result, latest_image_key, median_image_key):
+def save_modelB_result(bucket_name, comparison_result, latest_image_key, median_image_key, timestamp=None):
     """
     Save Model B comparison result to model-specific files
     """
     status_folder = 'status'
-    timestamp = datetime.now(timezone.utc).isoformat()
+    if timestamp is None:
+        timestamp = datetime.now(timezone.utc).isoformat()
     
     # Add common fields to comparison result
     comparison_result.update({
@@ -118,7 +96,7 @@ def save_modelB_result(bucket_name, comparison_result, latest_image_key, median_
     s3_client.put_object(
         Bucket=bucket_name,
         Key=latest_compare_key,
-        Body=json.dumps(comparison_result, indent=2),
+        Body=json.dumps(comparison_result, separators=JSON_SEPARATORS),
         ContentType='application/json',
         Metadata={
             'created_at': timestamp,
@@ -127,51 +105,7 @@ def save_modelB_result(bucket_name, comparison_result, latest_image_key, median_
         }
     )
     
-    # Update statistics array in model-specific file
-    statistics_key = f"{status_folder}/statistics-modelb.json"
-    try:
-        # Try to read existing statistics
-        statistics_response = s3_client.get_object(Bucket=bucket_name, Key=statistics_key)
-        statistics_data = json.loads(statistics_response['Body'].read())
-        comparisons = statistics_data.get('comparisons', [])
-    except ClientError as e:
-        if e.response['Error']['Code'] == 'NoSuchKey':
-            # File doesn't exist, create new
-            comparisons = []
-        else:
-            logger.error(f"Error reading statistics file: {str(e)}")
-            comparisons = []
-    except Exception as e:
-        logger.error(f"Unexpected error reading statistics: {str(e)}")
-        comparisons = []
-    
-    # Add new comparison to the beginning of the array
-    comparisons.insert(0, comparison_result)
-    
-    # Keep only comparisons from the last 60 days to prevent file from growing too large
-    from datetime import timedelta
-    sixty_days_ago = datetime.now(timezone.utc) - timedelta(days=60)
-    comparisons = [c for c in comparisons if datetime.fromisoformat(c['timestamp'].replace('Z', '+00:00')) >= sixty_days_ago]
-    
-    # Save updated statistics
-    statistics_data = {
-        'model_name': 'ModelB',
-        'total_comparisons': len(comparisons),
-        'last_updated': timestamp,
-        'comparisons': comparisons
-    }
-    
-    logger.info(f"Saving updated ModelB statistics to {statistics_key}")
-    s3_client.put_object(
-        Bucket=bucket_name,
-        Key=statistics_key,
-        Body=json.dumps(statistics_data, indent=2),
-        ContentType='application/json',
-        Metadata={
-            'last_updated': timestamp,
-            'total_comparisons': str(len(comparisons)),
-            'model_name': 'ModelB'
-        }
-    )
+    # Record the run in the history; statistics-modelb.json is rebuilt from it on read
+    append_comparison(bucket_name, 'ModelB', comparison_result)
     
     return comparison_result
@@ -5,8 +5,8 @@ import os
 from datetime import datetime, timezone
 import numpy as np
 from PIL import Image
-import io
-from botocore.exceptions import ClientError
+from statistics_store import append_comparison, JSON_SEPARATORS
+from model_common import prepare, diff_and_mark, encode_jpeg
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -23,9 +23,8 @@ def calculate_brightness(image):
     else:
         gray_image = image
     
-    # Convert to numpy array and calculate mean
-    gray_array = np.array(gray_image, dtype=np.float32)
-    brightness = np.mean(gray_array)
+    # Mean straight off a uint8 view: no float32 copy of the image
+    brightness = np.asarray(gray_image).mean()
     
     return brightness
 
@@ -65,7 +64,7 @@ def adjust_brightness(image, target_brightness):
     
     return adjusted_image
 
-def modelC_comparison(latest_image, median_image, latest_image_key, median_image_key, bucket_name):
+def modelC_comparison(latest_image, median_image, latest_image_key, median_image_key, bucket_name, timestamp=None):
     """
     Model C: Brightness-adjusted comparison (same as Model D)
     1. Calculate overall brightness of latest.jpg and median image
@@ -73,6 +72,9 @@ def modelC_comparison(latest_image, median_image, latest_image_key, median_image
     3. Compare using same logic as Model A
     4. Save the brightness-adjusted image to /status/modelC.jpg
     """
+    if timestamp is None:
+        timestamp = datetime.now(timezone.utc).isoformat()
+    
     logger.info("ModelC: Starting brightness-adjusted comparison")
     
     # Calculate brightness of both images
@@ -85,61 +87,32 @@ def modelC_comparison(latest_image, median_image, latest_image_key, median_image
     adjusted_latest_image = adjust_brightness(latest_image, median_brightness)
     
     # Now perform comparison using Model A logic on the adjusted image
-    # Convert to grayscale if not already
-    if adjusted_latest_image.mode != 'L':
-        adjusted_latest_image = adjusted_latest_image.convert('L')
-    if median_image.mode != 'L':
-        median_image = median_image.convert('L')
-    
-    # Only resize adjusted latest image if it's different size than median image
-    if adjusted_latest_image.size != median_image.size:
-        logger.info(f"ModelC: Resizing adjusted latest image from {adjusted_latest_image.size} to {median_image.size}")
-        adjusted_latest_image = adjusted_latest_image.resize(median_image.size, Image.Resampling.LANCZOS)
-    else:
-        logger.info(f"ModelC: Images already same size: {adjusted_latest_image.size}")
-    
+    # Grayscale, size-match and view both images as uint8 (shared with the other models)
+    latest_array, median_array = prepare(adjusted_latest_image, median_image)
     target_size = median_image.size
     
-    # Convert to numpy arrays
-    latest_array = np.array(adjusted_latest_image, dtype=np.float32)
-    median_array = np.array(median_image, dtype=np.float32)
-    
     # Calculate difference
     logger.info("ModelC: Calculating pixel differences on brightness-adjusted image")
-    diff_array = np.abs(latest_array - median_array)
+    # Difference, threshold (20) and yellow marking in one shared kernel
+    different_pixels, vis_array = diff_and_mark(latest_array, median_array, 20)
     
     # Calculate percentage difference
     total_pixels = latest_array.size
-    different_pixels = np.sum(diff_array > 20)  # Threshold of 20 for significant difference
     difference_percentage = (different_pixels / total_pixels) * 100
     
-    # Create visualization image with yellow pixels for differences
-    # Convert grayscale back to RGB for yellow marking
-    visualization_image = adjusted_latest_image.convert('RGB')
-    vis_array = np.array(visualization_image)
-    
-    # Mark different pixels as pure yellow (255, 255, 0)
-    diff_mask = diff_array > 20
-    vis_array[diff_mask] = [255, 255, 0]  # Pure yellow
-    
-    # Convert back to PIL Image
-    visualization_image = Image.fromarray(vis_array, 'RGB')
-    
     # Save the visualization image with yellow pixels to S3
     try:
-        output_buffer = io.BytesIO()
-        visualization_image.save(output_buffer, format='JPEG', quality=95)
-        visualization_bytes = output_buffer.getvalue()
+        visualization_buffer = encode_jpeg(vis_array, quality=95)
         
         # Save visualization to S3
         modelc_image_key = 'status/modelC.jpg'
         s3_client.put_object(
             Bucket=bucket_name,
             Key=modelc_image_key,
-            Body=visualization_bytes,
+            Body=visualization_buffer,
             ContentType='image/jpeg',
             Metadata={
-                'created_at': datetime.now(timezone.utc).isoformat(),
+                'created_at': timestamp,
                 'model': 'ModelC',
                 'original_brightness': str(latest_brightness),
                 'target_brightness': str(median_brightness),
@@ -170,12 +143,13 @@ def modelC_comparison(latest_image, median_image, latest_image_key, median_image
         'adjusted_image_saved': True
     }
 
-def save_modelC_result(bucket_name, comparison_result, latest_image_key, median_image_key):
+def save_modelC_result(bucket_name, comparison_result, latest_image_key, median_image_key, timestamp=None):
     """
     Save Model C comparison result to model-specific files
     """
     status_folder = 'status'
-    timestamp = datetime.now(timezone.utc).isoformat()
+    if timestamp is None:
+        timestamp = datetime.now(timezone.utc).isoformat()
     
     # Add common fields to comparison result
     comparison_result.update({
@@ -190,7 +164,7 @@ def save_modelC_result(bucket_name, comparison_result, latest_image_key, median_
     s3_client.put_object(
         Bucket=bucket_name,
         Key=latest_compare_key,
-        Body=json.dumps(comparison_result, indent=2),
+        Body=json.dumps(comparison_result, separators=JSON_SEPARATORS),
         ContentType='application/json',
         Metadata={
             'created_at': timestamp,
@@ -199,51 +173,7 @@ def save_modelC_result(bucket_name, comparison_result, latest_image_key, median_
         }
     )
     
-    # Update statistics array in model-specific file
-    statistics_key = f"{status_folder}/statistics-modelc.json"
-    try:
-        # Try to read existing statistics
-        statistics_response = s3_client.get_object(Bucket=bucket_name, Key=statistics_key)
-        statistics_data = json.loads(statistics_response['Body'].read())
-        comparisons = statistics_data.get('comparisons', [])
-    except ClientError as e:
-        if e.response['Error']['Code'] == 'NoSuchKey':
-            # File doesn't exist, create new
-            comparisons = []
-        else:
-            logger.error(f"Error reading statistics file: {str(e)}")
-            comparisons = []
-    except Exception as e:
-        logger.error(f"Unexpected error reading statistics: {str(e)}")
-        comparisons = []
-    
-    # Add new comparison to the beginning of the array
-    comparisons.insert(0, comparison_result)
-    
-    # Keep only comparisons from the last 60 days to prevent file from growing too large
-    from datetime import timedelta
-    sixty_days_ago = datetime.now(timezone.utc) - timedelta(days=60)
-    comparisons = [c for c in comparisons if datetime.fromisoformat(c['timestamp'].replace('Z', '+00:00')) >= sixty_days_ago]
-    
-    # Save updated statistics
-    statistics_data = {
-        'model_name': 'ModelC',
-        'total_comparisons': len(comparisons),
-        'last_updated': timestamp,
-        'comparisons': comparisons
-    }
-    
-    logger.info(f"Saving updated ModelC statistics to {statistics_key}")
-    s3_client.put_object(
-        Bucket=bucket_name,
-        Key=statistics_key,
-        Body=json.dumps(statistics_data, indent=2),
-        ContentType='application/json',
-        Metadata={
-            'last_updated': timestamp,
-            'total_comparisons': str(len(comparisons)),
-            'model_name': 'ModelC'
-        }
-    )
+    # Record the run in the history; statistics-modelc.json is rebuilt from it on read
+    append_comparison(bucket_name, 'ModelC', comparison_result)
     
     return comparison_result
\ No newline at end of file
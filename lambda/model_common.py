@@ -0,0 +1,124 @@
+import logging
+import numpy as np
+from PIL import Image
+import io
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Grayscale median images kept across warm invocations: (bucket, key) -> (etag, image)
+_MEDIAN_CACHE = {}
+
+def to_grayscale(image):
+    """
+    Return the image in mode 'L', converting only if needed
+    """
+    if image.mode != 'L':
+        return image.convert('L')
+    return image
+
+def decode_gray(data, size=None):
+    """
+    Decode image bytes straight to a loaded mode 'L' image.
+    For JPEGs, draft() makes libjpeg emit only the luma channel (no chroma upsampling or
+    RGB conversion) and, given a target size, lets it DCT-scale down by up to 8x while
+    staying at or above that size. Other formats fall back to a regular convert
+    """
+    image = Image.open(io.BytesIO(data))
+    image.draft('L', size)
+    image = to_grayscale(image)
+    image.load()
+    return image
+
+def cached_median(bucket_name, key, etag):
+    """
+    Return the grayscale median image cached for this ETag, or None on a miss
+    """
+    cached = _MEDIAN_CACHE.get((bucket_name, key))
+    if cached is not None and cached[0] == etag:
+        logger.info(f"Using cached median image for {key} (ETag {etag})")
+        return cached[1]
+    return None
+
+def cache_median(bucket_name, key, etag, median_image):
+    """
+    Make sure the median image is grayscale, cache it under its ETag and return it,
+    so warm invocations skip the median download, decode and conversion
+    """
+    median_image = to_grayscale(median_image)
+    median_image.load()
+    _MEDIAN_CACHE[(bucket_name, key)] = (etag, median_image)
+    return median_image
+
+def prepare(latest_image, median_image):
+    """
+    Shared preprocessing for the comparison models:
+    grayscale both images, resize latest to the median's size and view both as uint8 arrays.
+    Callers running several models on the same pair prepare it once and pass the arrays on.
+    Returns (latest_array, median_array)
+    """
+    median_array = np.asarray(to_grayscale(median_image))
+    latest_gray = to_grayscale(latest_image)
+
+    # Only resize latest image if it's different size than median image.
+    # Downscales use BOX (area averaging) and upscales BILINEAR: both much cheaper
+    # than LANCZOS and plenty for a difference thresholded at 10+ gray levels.
+    if latest_gray.size != median_image.size:
+        logger.info(f"Resizing latest image from {latest_gray.size} to {median_image.size}")
+        downscale = latest_gray.width >= median_image.width and latest_gray.height >= median_image.height
+        resample = Image.Resampling.BOX if downscale else Image.Resampling.BILINEAR
+        latest_gray = latest_gray.resize(median_image.size, resample)
+    else:
+        logger.info(f"Images already same size: {latest_gray.size}")
+
+    latest_array = np.asarray(latest_gray)
+
+    return latest_array, median_array
+
+def abs_diff(latest_array, median_array):
+    """
+    uint8 absolute difference of two arrays
+    """
+    # Computed in uint8: max - min never wraps around
+    diff_array = np.maximum(latest_array, median_array)
+    np.subtract(diff_array, np.minimum(latest_array, median_array), out=diff_array)
+    return diff_array
+
+def diff_and_mark(latest_array, median_array, threshold, diff_array=None, gray_if_unchanged=False):
+    """
+    Fused difference kernel shared by the comparison models:
+    uint8 absolute difference (see abs_diff), threshold, count and yellow marking,
+    with masked stores for the marking. diff_array can be passed in when the caller
+    already has the difference for this pair (models A and B share one); it is not modified.
+    Returns (different_pixels, vis_array) where vis_array is the latest image as RGB
+    with every pixel differing by more than threshold painted pure yellow (255, 255, 0).
+    With gray_if_unchanged, vis_array is the grayscale latest array itself when no pixel differs
+    """
+    if diff_array is None:
+        diff_array = abs_diff(latest_array, median_array)
+    diff_mask = np.greater(diff_array, threshold)
+    different_pixels = int(np.count_nonzero(diff_mask))
+
+    # Nothing to mark: the gray image itself is the visualization (no RGB buffer,
+    # and a single-channel JPEG encode)
+    if gray_if_unchanged and not different_pixels:
+        return different_pixels, latest_array
+
+    # Broadcast gray into all three channels, then paint the flagged pixels in place
+    vis_array = np.empty(latest_array.shape + (3,), dtype=np.uint8)
+    vis_array[...] = latest_array[..., None]
+    np.copyto(vis_array[..., 0], np.uint8(255), where=diff_mask)
+    np.copyto(vis_array[..., 1], np.uint8(255), where=diff_mask)
+    np.copyto(vis_array[..., 2], np.uint8(0), where=diff_mask)
+
+    return different_pixels, vis_array
+
+def encode_jpeg(array, quality=95):
+    """
+    Encode a uint8 array (H x W or H x W x 3) as JPEG.
+    Returns a BytesIO rewound to the start, ready to pass as an S3 Body without a getvalue() copy
+    """
+    buffer = io.BytesIO()
+    Image.fromarray(array).save(buffer, format='JPEG', quality=quality)
+    buffer.seek(0)
+    return buffer
@@ -1,16 +1,15 @@
 import json
-import boto3
 import logging
 import os
 from datetime import datetime, timezone
-import numpy as np
-from PIL import Image
-import io
-from botocore.exceptions import ClientError
+from PIL import ImageStat
+from aws_clients import make_s3_client
+from model_common import to_grayscale, prepare, diff_and_mark, encode_jpeg
+from statistics_store import append_comparison, JSON_SEPARATORS
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
-s3_client = boto3.client('s3')
+s3_client = make_s3_client()
 
 def calculate_brightness(image):
     """
@@ -23,25 +22,26 @@ def calculate_brightness(image):
     else:
         gray_image = image
     
-    # Convert to numpy array and calculate mean
-    gray_array = np.array(gray_image, dtype=np.float32)
-    brightness = np.mean(gray_array)
+    # Mean from Pillow's C histogram pass; no numpy array at all
+    brightness = ImageStat.Stat(gray_image).mean[0]
     
     return brightness
 
-def adjust_brightness(image, target_brightness):
+def adjust_brightness(image, target_brightness, current_brightness=None):
     """
     Adjust the brightness of an image to match the target brightness
-    Returns a new PIL Image with adjusted brightness
+    current_brightness can be passed in when the caller has already measured it
+    Returns a grayscale PIL Image with adjusted brightness (the input itself if no adjustment is needed)
     """
-    # Convert to RGB if not already (needed for brightness adjustment)
-    if image.mode != 'RGB':
-        rgb_image = image.convert('RGB')
+    # The comparison is grayscale, so adjust the grayscale image directly
+    if image.mode != 'L':
+        gray_image = image.convert('L')
     else:
-        rgb_image = image
+        gray_image = image
     
     # Calculate current brightness
-    current_brightness = calculate_brightness(rgb_image)
+    if current_brightness is None:
+        current_brightness = calculate_brightness(gray_image)
     
     # Calculate brightness adjustment factor
     if current_brightness > 0:
@@ -51,21 +51,24 @@ def adjust_brightness(image, target_brightness):
     
     logger.info(f"Brightness adjustment: current={current_brightness:.2f}, target={target_brightness:.2f}, factor={brightness_factor:.2f}")
     
-    # Convert to numpy array for adjustment
-    rgb_array = np.array(rgb_image, dtype=np.float32)
-    
-    # Apply brightness adjustment
-    adjusted_array = rgb_array * brightness_factor
+    # Stable lighting: a factor within 1% of 1.0 is not worth a pass over the image
+    if abs(brightness_factor - 1.0) < 0.01:
+        logger.info("Brightness adjustment skipped (factor ~1.0)")
+        return gray_image
     
-    # Clip values to valid range (0-255)
-    adjusted_array = np.clip(adjusted_array, 0, 255)
-    
-    # Convert back to PIL Image
-    adjusted_image = Image.fromarray(adjusted_array.astype(np.uint8))
+    # Apply the factor as a fixed-point ratio through a 256-entry lookup table:
+    # one C pass over the pixels with no intermediate arrays
+    if current_brightness > 0:
+        factor_num = int(round(target_brightness * 256))
+        factor_den = max(1, int(round(current_brightness * 256)))
+    else:
+        factor_num = factor_den = 1
+    lut = [min(255, (value * factor_num) // factor_den) for value in range(256)]
+    adjusted_image = gray_image.point(lut)
     
     return adjusted_image
 
-def modelD_comparison(latest_image, median_image, latest_image_key, median_image_key, bucket_name):
+def modelD_comparison(latest_image, median_image, latest_image_key, median_image_key, bucket_name, timestamp=None):
     """
     Model D: Brightness-adjusted comparison
     1. Calculate overall brightness of latest.jpg and median image
@@ -73,8 +76,16 @@ def modelD_comparison(latest_image, median_image, latest_image_key, median_image
     3. Compare using same logic as Model A
     4. Save the brightness-adjusted image to /status/modelD.jpg
     """
+    if timestamp is None:
+        timestamp = datetime.now(timezone.utc).isoformat()
+    
     logger.info("ModelD: Starting brightness-adjusted comparison")
     
+    # Grayscale once up front; brightness, adjustment and difference all work in 'L'
+    # (no-ops for the grayscale images the compare handler decodes)
+    latest_image = to_grayscale(latest_image)
+    median_image = to_grayscale(median_image)
+    
     # Calculate brightness of both images
     latest_brightness = calculate_brightness(latest_image)
     median_brightness = calculate_brightness(median_image)
@@ -82,64 +93,37 @@ def modelD_comparison(latest_image, median_image, latest_image_key, median_image
     logger.info(f"ModelD: Latest brightness={latest_brightness:.2f}, Median brightness={median_brightness:.2f}")
     
     # Adjust latest image brightness to match median brightness
-    adjusted_latest_image = adjust_brightness(latest_image, median_brightness)
-    
-    # Now perform comparison using Model A logic on the adjusted image
-    # Convert to grayscale if not already
-    if adjusted_latest_image.mode != 'L':
-        adjusted_latest_image = adjusted_latest_image.convert('L')
-    if median_image.mode != 'L':
-        median_image = median_image.convert('L')
-    
-    # Only resize adjusted latest image if it's different size than median image
-    if adjusted_latest_image.size != median_image.size:
-        logger.info(f"ModelD: Resizing adjusted latest image from {adjusted_latest_image.size} to {median_image.size}")
-        adjusted_latest_image = adjusted_latest_image.resize(median_image.size, Image.Resampling.LANCZOS)
-    else:
-        logger.info(f"ModelD: Images already same size: {adjusted_latest_image.size}")
+    adjusted_latest_image = adjust_brightness(latest_image, median_brightness, latest_brightness)
     
+    # Now perform comparison using Model A logic on the adjusted image: grayscale,
+    # size-match (skipped when sizes agree) and view as uint8, shared with the other models
+    latest_array, median_array = prepare(adjusted_latest_image, median_image)
     target_size = median_image.size
     
-    # Convert to numpy arrays
-    latest_array = np.array(adjusted_latest_image, dtype=np.float32)
-    median_array = np.array(median_image, dtype=np.float32)
-    
     # Calculate difference
     logger.info("ModelD: Calculating pixel differences on brightness-adjusted image")
-    diff_array = np.abs(latest_array - median_array)
+    # Difference, threshold (10) and yellow marking in one shared kernel: the gray image
+    # is broadcast into RGB once and flagged pixels are written channel by channel.
+    # With no difference at all the overlay is saved as plain grayscale
+    different_pixels, vis_array = diff_and_mark(latest_array, median_array, 10, gray_if_unchanged=True)
     
     # Calculate percentage difference
     total_pixels = latest_array.size
-    different_pixels = np.sum(diff_array > 10)  # Threshold of 10 for significant difference
     difference_percentage = (different_pixels / total_pixels) * 100
     
-    # Create visualization image with yellow pixels for differences
-    # Convert grayscale back to RGB for yellow marking
-    visualization_image = adjusted_latest_image.convert('RGB')
-    vis_array = np.array(visualization_image)
-    
-    # Mark different pixels as pure yellow (255, 255, 0)
-    diff_mask = diff_array > 10
-    vis_array[diff_mask] = [255, 255, 0]  # Pure yellow
-    
-    # Convert back to PIL Image
-    visualization_image = Image.fromarray(vis_array, 'RGB')
-    
     # Save the visualization image with yellow pixels to S3
     try:
-        output_buffer = io.BytesIO()
-        visualization_image.save(output_buffer, format='JPEG', quality=95)
-        visualization_bytes = output_buffer.getvalue()
+        visualization_buffer = encode_jpeg(vis_array, quality=85)  # Debug overlay: 85 is visually the same at about half the size
         
         # Save visualization to S3
         modeld_image_key = 'status/modelD.jpg'
         s3_client.put_object(
             Bucket=bucket_name,
             Key=modeld_image_key,
-            Body=visualization_bytes,
+            Body=visualization_buffer,
             ContentType='image/jpeg',
             Metadata={
-                'created_at': datetime.now(timezone.utc).isoformat(),
+                'created_at': timestamp,
                 'model': 'ModelD',
                 'original_brightness': str(latest_brightness),
                 'target_brightness': str(median_brightness),
@@ -170,12 +154,13 @@ def modelD_comparison(latest_image, median_image, latest_image_key, median_image
         'adjusted_image_saved': True
     }
 
-def save_modelD_result(bucket_name, comparison_result, latest_image_key, median_image_key):
+def save_modelD_result(bucket_name, comparison_result, latest_image_key, median_image_key, timestamp=None):
     """
     Save Model D comparison result to model-specific files
     """
     status_folder = 'status'
-    timestamp = datetime.now(timezone.utc).isoformat()
+    if timestamp is None:
+        timestamp = datetime.now(timezone.utc).isoformat()
     
     # Add common fields to comparison result
     comparison_result.update({
@@ -190,7 +175,7 @@ def save_modelD_result(bucket_name, comparison_result, latest_image_key, median_
     s3_client.put_object(
         Bucket=bucket_name,
         Key=latest_compare_key,
-        Body=json.dumps(comparison_result, indent=2),
+        Body=json.dumps(comparison_result, separators=JSON_SEPARATORS),
         ContentType='application/json',
         Metadata={
             'created_at': timestamp,
@@ -199,51 +184,7 @@ def save_modelD_result(bucket_name, comparison_result, latest_image_key, median_
         }
     )
     
-    # Update statistics array in model-specific file
-    statistics_key = f"{status_folder}/statistics-modeld.json"
-    try:
-        # Try to read existing statistics
-        statistics_response = s3_client.get_object(Bucket=bucket_name, Key=statistics_key)
-        statistics_data = json.loads(statistics_response['Body'].read())
-        comparisons = statistics_data.get('comparisons', [])
-    except ClientError as e:
-        if e.response['Error']['Code'] == 'NoSuchKey':
-            # File doesn't exist, create new
-            comparisons = []
-        else:
-            logger.error(f"Error reading statistics file: {str(e)}")
-            comparisons = []
-    except Exception as e:
-        logger.error(f"Unexpected error reading statistics: {str(e)}")
-        comparisons = []
-    
-    # Add new comparison to the beginning of the array
-    comparisons.insert(0, comparison_result)
-    
-    # Keep only comparisons from the last 60 days to prevent file from growing too large
-    from datetime import timedelta
-    sixty_days_ago = datetime.now(timezone.utc) - timedelta(days=60)
-    comparisons = [c for c in comparisons if datetime.fromisoformat(c['timestamp'].replace('Z', '+00:00')) >= sixty_days_ago]
-    
-    # Save updated statistics
-    statistics_data = {
-        'model_name': 'ModelD',
-        'total_comparisons': len(comparisons),
-        'last_updated': timestamp,
-        'comparisons': comparisons
-    }
-    
-    logger.info(f"Saving updated ModelD statistics to {statistics_key}")
-    s3_client.put_object(
-        Bucket=bucket_name,
-        Key=statistics_key,
-        Body=json.dumps(statistics_data, indent=2),
-        ContentType='application/json',
-        Metadata={
-            'last_updated': timestamp,
-            'total_comparisons': str(len(comparisons)),
-            'model_name': 'ModelD'
-        }
-    )
+    # Record the run in the history; statistics-modeld.json is rebuilt from it on read
+    append_comparison(bucket_name, 'ModelD', comparison_result)
     
     return comparison_result
\ No newline at end of file
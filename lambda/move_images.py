@@ -1,15 +1,85 @@
 import json
-import boto3
 import logging
 import os
+from aws_clients import make_s3_client
 from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize S3 client
-s3_client = boto3.client('s3')
+# Copies run on MAX_WORKERS threads sharing one client
+MAX_WORKERS = 16
+s3_client = make_s3_client(max_pool_connections=MAX_WORKERS)
+
+def copy_image(bucket_name, image_key, target_folder):
+    """
+    Copy one image into the target folder; the source is deleted afterwards in a batch.
+    Returns (copied, error_msg)
+    """
+    try:
+        # The image_key already contains the full path (e.g., "usortert/2025-08-31-17-36.jpg")
+        # So we use it directly as the source key
+        source_key = image_key
+        
+        # For the target, we need to replace the source folder with the target folder
+        # Extract just the filename from the source key
+        filename = image_key.split('/')[-1]
+        target_key = f"{target_folder}/{filename}"
+        
+        logger.info(f"Processing image: {source_key} -> {target_key}")
+        
+        # Copy image to target folder; a missing source surfaces here, no HEAD needed
+        copy_source = {'Bucket': bucket_name, 'Key': source_key}
+        try:
+            s3_client.copy_object(
+                CopySource=copy_source,
+                Bucket=bucket_name,
+                Key=target_key
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+                error_msg = f"Source image not found: {source_key}"
+                logger.warning(error_msg)
+                return False, error_msg
+            raise
+        logger.info(f"Copy successful: {source_key} -> {target_key}")
+        return True, None
+        
+    except Exception as e:
+        error_msg = f"Failed to move {image_key}: {str(e)}"
+        logger.error(error_msg)
+        logger.error(f"Exception details: {type(e).__name__}: {str(e)}")
+        return False, error_msg
+
+def delete_sources(bucket_name, source_keys):
+    """
+    Delete copied sources with delete_objects (up to 1000 keys per request).
+    Returns a list of error messages for keys that could not be deleted
+    """
+    errors = []
+    for start in range(0, len(source_keys), 1000):
+        batch = source_keys[start:start + 1000]
+        try:
+            response = s3_client.delete_objects(
+                Bucket=bucket_name,
+                Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+            )
+        except Exception as e:
+            # The whole batch failed (throttling, AccessDenied); its copies exist, so report
+            # each key as a partial failure rather than failing the request
+            for key in batch:
+                error_msg = f"Failed to move {key}: could not delete source ({str(e)})"
+                logger.error(error_msg)
+                errors.append(error_msg)
+            continue
+        for error in response.get('Errors', []):
+            error_msg = f"Failed to move {error['Key']}: could not delete source ({error.get('Code')}: {error.get('Message')})"
+            logger.error(error_msg)
+            errors.append(error_msg)
+    logger.info(f"Deleted {len(source_keys) - len(errors)} source images")
+    return errors
 
 def handler(event, context):
     """
@@ -24,11 +94,26 @@ def handler(event, context):
     """
     
     try:
-        # Parse request body
-        if isinstance(event['body'], str):
-            body = json.loads(event['body'])
+        # Parse request body (API Gateway sends a JSON string; direct invokes may pass a dict)
+        if isinstance(event.get('body'), str):
+            try:
+                body = json.loads(event['body'])
+            except ValueError:
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*',
+                        'Access-Control-Allow-Headers': 'Content-Type',
+                        'Access-Control-Allow-Methods': 'POST, OPTIONS'
+                    },
+                    'body': json.dumps({
+                        'success': False,
+                        'error': 'Invalid JSON in request body'
+                    })
+                }
         else:
-            body = event['body']
+            body = event.get('body') or {}
         
         source_folder = body.get('sourceFolder')
         target_folder = body.get('targetFolder')
@@ -80,58 +165,17 @@ def handler(event, context):
         
         logger.info(f"Moving {len(image_keys)} images from {source_folder} to {target_folder} in bucket {bucket_name}")
         
-        moved_count = 0
-        errors = []
+        # Copies are latency-bound single requests, so run them in parallel
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(image_keys))) as executor:
+            results = list(executor.map(lambda image_key: copy_image(bucket_name, image_key, target_folder), image_keys))
         
-        for image_key in image_keys:
-            try:
-                # The image_key already contains the full path (e.g., "usortert/2025-08-31-17-36.jpg")
-                # So we use it directly as the source key
-                source_key = image_key
-                
-                # For the target, we need to replace the source folder with the target folder
-                # Extract just the filename from the source key
-                filename = image_key.split('/')[-1]
-                target_key = f"{target_folder}/{filename}"
-                
-                logger.info(f"Processing image: {source_key} -> {target_key}")
-                
-                # Check if source image exists
-                try:
-                    s3_client.head_object(Bucket=bucket_name, Key=source_key)
-                    logger.info(f"Source image found: {source_key}")
-                except ClientError as e:
-                    if e.response['Error']['Code'] == '404':
-                        error_msg = f"Source image not found: {source_key}"
-                        logger.warning(error_msg)
-                        errors.append(error_msg)
-                        continue
-                    else:
-                        raise
-                
-                # Copy image to target folder
-                copy_source = {'Bucket': bucket_name, 'Key': source_key}
-                logger.info(f"Copying {source_key} to {target_key}")
-                s3_client.copy_object(
-                    CopySource=copy_source,
-                    Bucket=bucket_name,
-                    Key=target_key
-                )
-                logger.info(f"Copy successful: {source_key} -> {target_key}")
-                
-                # Delete from source folder
-                logger.info(f"Deleting source: {source_key}")
-                s3_client.delete_object(Bucket=bucket_name, Key=source_key)
-                logger.info(f"Delete successful: {source_key}")
-                
-                moved_count += 1
-                logger.info(f"Successfully moved {source_key} to {target_key}")
-                
-            except Exception as e:
-                error_msg = f"Failed to move {image_key}: {str(e)}"
-                logger.error(error_msg)
-                logger.error(f"Exception details: {type(e).__name__}: {str(e)}")
-                errors.append(error_msg)
+        copied_keys = [image_key for image_key, (copied, _) in zip(image_keys, results) if copied]
+        errors = [error_msg for copied, error_msg in results if not copied]
+        
+        # Then remove every copied source in one batched delete
+        delete_errors = delete_sources(bucket_name, copied_keys) if copied_keys else []
+        errors.extend(delete_errors)
+        moved_count = len(copied_keys) - len(delete_errors)
         
         # Prepare response
         if errors:
@@ -1,12 +1,12 @@
 import json
-import boto3
+from aws_clients import make_s3_client
 import logging
 import os
 from datetime import datetime, timezone
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
-s3_client = boto3.client('s3')
+s3_client = make_s3_client()
 
 def handler(event, context):
     """
@@ -22,7 +22,6 @@ def handler(event, context):
             # Try to get the log file
             response = s3_client.get_object(Bucket=bucket_name, Key=log_key)
             log_content = response['Body'].read().decode('utf-8')
-            log_data = json.loads(log_content)
             
             return {
                 'statusCode': 200,
@@ -31,11 +30,9 @@ def handler(event, context):
                     'Access-Control-Allow-Headers': 'Content-Type',
                     'Access-Control-Allow-Methods': 'GET, OPTIONS'
                 },
-                'body': json.dumps({
-                    'success': True,
-                    'logExists': True,
-                    'logData': log_data
-                })
+                # The log is JSON written by create_median_image, so embed it as is
+                # instead of parsing and re-serializing it
+                'body': '{"success":true,"logExists":true,"logData":' + log_content + '}'
             }
             
         except s3_client.exceptions.NoSuchKey:
@@ -0,0 +1,196 @@
+import json
+import gzip
+import boto3
+import logging
+from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from bisect import bisect_left
+from operator import itemgetter
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+s3_client = boto3.client('s3')
+
+# Compact separators: nobody reads these files raw, and the webapp pretty-prints in the editor
+JSON_SEPARATORS = (',', ':')
+
+STATUS_FOLDER = 'status'
+RETENTION_DAYS = 60
+
+# Metadata key on the aggregate recording the last history entry folded into it
+CURSOR_METADATA_KEY = 'history_cursor'
+
+# History entries folded per consolidate() call. Progress is saved after each batch, so a
+# large backlog catches up over several reads instead of outrunning the API timeout
+FOLD_BATCH_SIZE = 500
+
+# A comparison's history key is stamped before the models run but written after them, so a
+# key only counts as final once it is older than the comparison function's timeout (5 min).
+# Newer entries are shown but not folded, so the cursor never skips one still in flight
+SETTLE_SECONDS = 300
+
+def history_prefix(model_name):
+    return f"{STATUS_FOLDER}/history/{model_name.lower()}/"
+
+def statistics_key(model_name):
+    return f"{STATUS_FOLDER}/statistics-{model_name.lower()}.json"
+
+def append_comparison(bucket_name, model_name, comparison_result):
+    """
+    Record one comparison as its own history object (a single PUT, no read-modify-write).
+    Keys are the ISO timestamp, so a prefix listing returns them oldest first
+    """
+    history_key = f"{history_prefix(model_name)}{comparison_result['timestamp']}.json"
+    logger.info(f"Appending {model_name} comparison to {history_key}")
+    s3_client.put_object(
+        Bucket=bucket_name,
+        Key=history_key,
+        Body=json.dumps(comparison_result, separators=JSON_SEPARATORS),
+        ContentType='application/json'
+    )
+    return history_key
+
+def read_json_body(response):
+    """
+    Parse a get_object response as JSON, gunzipping it first if it was stored gzip-encoded
+    (boto3 does not decompress ContentEncoding: gzip bodies itself)
+    """
+    body = response['Body'].read()
+    if response.get('ContentEncoding') == 'gzip':
+        body = gzip.decompress(body)
+    return json.loads(body)
+
+def _read_object_json(bucket_name, key):
+    return read_json_body(s3_client.get_object(Bucket=bucket_name, Key=key))
+
+def _list_history(bucket_name, model_name, start_after, limit):
+    paginator = s3_client.get_paginator('list_objects_v2')
+    params = {'Bucket': bucket_name, 'Prefix': history_prefix(model_name), 'PaginationConfig': {'MaxItems': limit}}
+    if start_after:
+        params['StartAfter'] = start_after
+    return [obj['Key'] for page in paginator.paginate(**params) for obj in page.get('Contents', [])]
+
+def is_write_conflict(error):
+    """
+    True if a conditional write_statistics() lost to another writer
+    """
+    return error.response['Error']['Code'] in ('PreconditionFailed', 'ConditionalRequestConflict')
+
+def write_statistics(bucket_name, model_name, statistics_data, cursor, etag, metadata=None):
+    """
+    Save the aggregate statistics file gzip-compressed, carrying the history cursor
+    along in its metadata. The write is conditional on the aggregate still having the
+    ETag it was read with (or, for etag None, on it not existing yet), so readers folding
+    history and editor saves never overwrite each other; a lost race raises a ClientError
+    that is_write_conflict() recognizes. Returns the new ETag
+    """
+    metadata = dict(metadata or {})
+    if cursor:
+        metadata[CURSOR_METADATA_KEY] = cursor
+    condition = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
+    response = s3_client.put_object(
+        Bucket=bucket_name,
+        Key=statistics_key(model_name),
+        Body=gzip.compress(json.dumps(statistics_data, separators=JSON_SEPARATORS).encode('utf-8'), compresslevel=6),
+        ContentType='application/json',
+        ContentEncoding='gzip',
+        Metadata=metadata,
+        **condition
+    )
+    return response['ETag']
+
+def consolidate(bucket_name, model_name):
+    """
+    Fold settled history entries newer than the aggregate's cursor into
+    statistics-<model>.json, at most FOLD_BATCH_SIZE per call. The aggregate is only
+    rewritten when there is something new to fold in; entries younger than SETTLE_SECONDS
+    are appended to the returned data only. If another reader or an editor save changes
+    the aggregate mid-fold, the fold is redone once on the new version.
+    Returns (statistics_data, cursor, etag); statistics_data and etag are None if the
+    aggregate does not exist yet
+    """
+    try:
+        return _consolidate_once(bucket_name, model_name)
+    except ClientError as e:
+        if not is_write_conflict(e):
+            raise e
+        logger.info(f"{model_name} statistics changed while folding; folding again")
+        return _consolidate_once(bucket_name, model_name)
+
+def _consolidate_once(bucket_name, model_name):
+    key = statistics_key(model_name)
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=key)
+        statistics_data = read_json_body(response)
+        cursor = response.get('Metadata', {}).get(CURSOR_METADATA_KEY)
+        etag = response['ETag']
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'NoSuchKey':
+            raise e
+        statistics_data = None
+        cursor = None
+        etag = None
+
+    new_keys = _list_history(bucket_name, model_name, cursor, FOLD_BATCH_SIZE)
+    if not new_keys:
+        return statistics_data, cursor, etag
+
+    if len(new_keys) == FOLD_BATCH_SIZE:
+        logger.info(f"{model_name} history backlog exceeds one batch; the rest is folded on later reads")
+    with ThreadPoolExecutor(max_workers=min(16, len(new_keys))) as executor:
+        new_comparisons = list(executor.map(lambda k: _read_object_json(bucket_name, k), new_keys))
+
+    # The editor may save the aggregate as a bare array
+    if isinstance(statistics_data, list):
+        comparisons = statistics_data
+    elif statistics_data:
+        comparisons = statistics_data.get('comparisons', [])
+    else:
+        comparisons = []
+
+    # The editor may already have saved recent entries it was shown, so skip timestamps
+    # that are present
+    present = {c['timestamp'] for c in comparisons}
+    new_comparisons = [c for c in new_comparisons if c['timestamp'] not in present]
+
+    # Keys are the timestamp, so the settled entries are a sorted prefix of the listing
+    settle_cutoff = (datetime.now(timezone.utc) - timedelta(seconds=SETTLE_SECONDS)).isoformat()
+    settled_keys = new_keys[:bisect_left(new_keys, f"{history_prefix(model_name)}{settle_cutoff}")]
+    settled = bisect_left(new_comparisons, settle_cutoff, key=itemgetter('timestamp'))
+    settled_comparisons, recent_comparisons = new_comparisons[:settled], new_comparisons[settled:]
+
+    # Stored oldest first; the list is already sorted (or reverse sorted, for aggregates
+    # written newest first by earlier versions), which Timsort handles in a single pass
+    comparisons.extend(settled_comparisons)
+    comparisons.sort(key=itemgetter('timestamp'))
+
+    # Keep only comparisons from the last 60 days to prevent file from growing too large;
+    # the list is sorted, so the cutoff is a binary search instead of a full filter pass.
+    # UTC ISO-8601 timestamps sort lexicographically, so no parsing is needed
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=RETENTION_DAYS)).isoformat()
+    start = bisect_left(comparisons, cutoff, key=itemgetter('timestamp'))
+    if start:
+        comparisons = comparisons[start:]
+
+    timestamp = datetime.now(timezone.utc).isoformat()
+    statistics_data = {
+        'model_name': model_name,
+        'total_comparisons': len(comparisons),
+        'last_updated': timestamp,
+        'comparisons': comparisons
+    }
+    if settled_keys:
+        logger.info(f"Folding {len(settled_keys)} new {model_name} comparison keys into {key}")
+        cursor = settled_keys[-1]
+        etag = write_statistics(bucket_name, model_name, statistics_data, cursor, etag, {
+            'last_updated': timestamp,
+            'total_comparisons': str(len(comparisons)),
+            'model_name': model_name
+        })
+
+    # Entries still inside the settle window are shown without being folded
+    if recent_comparisons:
+        comparisons = sorted(comparisons + recent_comparisons, key=itemgetter('timestamp'))
+        statistics_data = dict(statistics_data, comparisons=comparisons, total_comparisons=len(comparisons))
+    return statistics_data, cursor, etag
@@ -1,12 +1,105 @@
-import boto3
 import json
 import os
+import logging
 from datetime import datetime
 from PIL import Image
 import io
-from thumbnail_utils import create_thumbnail
+from aws_clients import make_s3_client
+from concurrent.futures import ThreadPoolExecutor
+from thumbnail_utils import create_thumbnail, THUMBNAIL_WORKERS
 
-s3_client = boto3.client('s3')
+# Worker threads for the thumbnail checks and creation; thumbnail_utils sizes its client
+# pool for the same count
+MAX_WORKERS = THUMBNAIL_WORKERS
+
+# One pooled connection per worker thread; boto3 clients are safe to share across threads
+s3_client = make_s3_client(max_pool_connections=MAX_WORKERS)
+
+THUMBNAIL_PREFIX = 'thumbnails/'
+THUMBNAIL_SUFFIX = '-thumbnail.jpg'
+
+# Per-object listing output goes to debug and thumbnail check failures to warning;
+# progress and the remaining errors stay on print
+logger = logging.getLogger()
+
+def _list_objects(bucket_name, prefix):
+    """
+    Return the LIST entries (Key, ETag, LastModified, ...) under a prefix keyed by key,
+    following pagination past 1000 objects
+    """
+    paginator = s3_client.get_paginator('list_objects_v2')
+    return {obj['Key']: obj for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix, PaginationConfig={'PageSize': 1000}) for obj in page.get('Contents', [])}
+
+def _is_stale(bucket_name, thumbnail_key, source_etag):
+    """
+    Only called for thumbnails older than their source. True if the thumbnail was made from
+    a different version of the source (per the source ETag recorded in its metadata).
+    Otherwise, including thumbnails made before the ETag was recorded, the thumbnail counts
+    as fresh and gets a metadata-only self-copy recording the ETag; that also makes it newer
+    than its source, so later syncs skip it without a HEAD
+    """
+    source_etag = source_etag.strip('"')
+    try:
+        metadata = s3_client.head_object(Bucket=bucket_name, Key=thumbnail_key).get('Metadata', {})
+        recorded_etag = metadata.get('source-etag')
+        if recorded_etag is not None and recorded_etag != source_etag:
+            return True
+        s3_client.copy_object(
+            Bucket=bucket_name,
+            Key=thumbnail_key,
+            CopySource={'Bucket': bucket_name, 'Key': thumbnail_key},
+            MetadataDirective='REPLACE',
+            ContentType='image/jpeg',
+            Metadata=dict(metadata, **{'source-etag': source_etag})
+        )
+    except Exception as e:
+        logger.warning(f"Error checking thumbnail {thumbnail_key}: {str(e)}")
+    return False
+
+def _make_thumb(bucket_name, filename, source_key):
+    """
+    Create the thumbnail for one source image. Returns (filename, thumbnail_key) or None on failure
+    """
+    try:
+        print(f"Creating thumbnail for: {filename}")
+        
+        # Create thumbnail filename
+        thumbnail_filename = filename.replace('.jpg', '-thumbnail.jpg')
+        thumbnail_key = f'thumbnails/{thumbnail_filename}'
+        
+        # Create thumbnail using shared utility
+        thumbnail_result = create_thumbnail(bucket_name, source_key, thumbnail_key)
+        
+        if thumbnail_result['success']:
+            print(f"Created thumbnail: {thumbnail_key} for {filename}")
+            return filename, thumbnail_key
+        print(f"Error creating thumbnail for {source_key}: {thumbnail_result['error']}")
+    except Exception as e:
+        print(f"Error creating thumbnail for {source_key}: {str(e)}")
+    return None
+
+def _delete_thumbs(bucket_name, thumbnail_keys):
+    """
+    Delete orphaned thumbnails with delete_objects (up to 1000 keys per request).
+    Returns the number of thumbnails deleted
+    """
+    deleted_count = 0
+    for start in range(0, len(thumbnail_keys), 1000):
+        chunk = thumbnail_keys[start:start + 1000]
+        try:
+            response = s3_client.delete_objects(
+                Bucket=bucket_name,
+                Delete={'Objects': [{'Key': key} for key in chunk], 'Quiet': True}
+            )
+        except Exception as e:
+            print(f"Error deleting thumbnails: {str(e)}")
+            continue
+        errors = response.get('Errors', [])
+        for error in errors:
+            print(f"Error deleting thumbnail {error['Key']}: {error.get('Code')}: {error.get('Message')}")
+        deleted_count += len(chunk) - len(errors)
+    print(f"Deleted {deleted_count} orphaned thumbnails")
+    return deleted_count
 
 def handler(event, context):
     try:
@@ -27,97 +120,74 @@ def handler(event, context):
         
         # Get all images from source folders
         source_images = {}
+        source_objects = {}
         for folder in source_folders:
             try:
-                response = s3_client.list_objects_v2(
-                    Bucket=bucket_name,
-                    Prefix=folder + '/',
-                    MaxKeys=1000
-                )
-                
-                if 'Contents' in response:
-                    for obj in response['Contents']:
-                        key = obj['Key']
-                        if key.endswith('.jpg'):
-                            # Extract filename without folder path
-                            filename = key.split('/')[-1]
-                            source_images[filename] = key
-                            print(f"Found source image: {filename}")
+                for key, obj in _list_objects(bucket_name, folder + '/').items():
+                    if key.endswith('.jpg'):
+                        # Extract filename without folder path
+                        filename = key.split('/')[-1]
+                        source_images[filename] = key
+                        source_objects[filename] = obj
+                        logger.debug(f"Found source image: {filename}")
             except Exception as e:
                 print(f"Error listing objects in {folder}: {str(e)}")
         
         # Get all thumbnails
         thumbnails = {}
+        thumbnail_objects = {}
         try:
-            response = s3_client.list_objects_v2(
-                Bucket=bucket_name,
-                Prefix='thumbnails/',
-                MaxKeys=1000
-            )
-            
-            if 'Contents' in response:
-                for obj in response['Contents']:
-                    key = obj['Key']
-                    if key.endswith('-thumbnail.jpg'):
-                        # Extract original filename from thumbnail name
-                        # e.g., "thumbnails/2025-08-31-17-35-thumbnail.jpg" -> "2025-08-31-17-35.jpg"
-                        # Remove the thumbnails/ prefix first, then replace -thumbnail.jpg with .jpg
-                        filename_without_prefix = key.replace('thumbnails/', '')
-                        original_filename = filename_without_prefix.replace('-thumbnail.jpg', '.jpg')
-                        thumbnails[original_filename] = key
-                        print(f"Found thumbnail: {key} -> {original_filename}")
+            for key, obj in _list_objects(bucket_name, THUMBNAIL_PREFIX).items():
+                if key.endswith(THUMBNAIL_SUFFIX):
+                    # Extract original filename from thumbnail name
+                    # e.g., "thumbnails/2025-08-31-17-35-thumbnail.jpg" -> "2025-08-31-17-35.jpg"
+                    # The listing prefix guarantees thumbnails/ at the start, so one slice drops both ends
+                    original_filename = key[len(THUMBNAIL_PREFIX):-len(THUMBNAIL_SUFFIX)] + '.jpg'
+                    thumbnails[original_filename] = key
+                    thumbnail_objects[original_filename] = obj
+                    logger.debug(f"Found thumbnail: {key} -> {original_filename}")
         except Exception as e:
             print(f"Error listing thumbnails: {str(e)}")
         
-        print(f"Source images: {list(source_images.keys())}")
-        print(f"Thumbnails: {list(thumbnails.keys())}")
+        print(f"Found {len(source_images)} source images and {len(thumbnails)} thumbnails")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Source images: {list(source_images.keys())}")
+            logger.debug(f"Thumbnails: {list(thumbnails.keys())}")
+        
+        # A source written after its thumbnail may have changed; the LIST entries give that for
+        # free, and only those candidates pay a HEAD to compare the source ETag the thumbnail
+        # records (once: fresh ones are re-stamped, stale ones regenerated)
+        candidates = [filename for filename in source_images.keys() & thumbnails.keys()
+                      if source_objects[filename]['LastModified'] > thumbnail_objects[filename]['LastModified']]
+        stale = set()
+        if candidates:
+            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(candidates))) as executor:
+                checks = executor.map(lambda filename: _is_stale(bucket_name, thumbnails[filename], source_objects[filename]['ETag']), candidates)
+                stale = {filename for filename, is_stale in zip(candidates, checks) if is_stale}
+        for filename in stale:
+            print(f"Source changed since thumbnail was made: {filename}")
         
-        # Create missing thumbnails
+        # Create missing and stale thumbnails; each is an S3 GET + resize + PUT, so fan them out
+        missing = [(filename, source_images[filename]) for filename in (source_images.keys() - thumbnails.keys()) | stale]
         created_count = 0
-        for filename, source_key in source_images.items():
-            if filename not in thumbnails:
-                try:
-                    print(f"Creating thumbnail for missing: {filename}")
-                    
-                    # Create thumbnail filename
-                    thumbnail_filename = filename.replace('.jpg', '-thumbnail.jpg')
-                    thumbnail_key = f'thumbnails/{thumbnail_filename}'
-                    
-                    # Create thumbnail using shared utility
-                    thumbnail_result = create_thumbnail(bucket_name, source_key, thumbnail_key)
-                    
-                    if thumbnail_result['success']:
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(missing))) as executor:
+                for created in executor.map(lambda item: _make_thumb(bucket_name, *item), missing):
+                    if created:
                         # Add the newly created thumbnail to the thumbnails dictionary
                         # Use the original filename as the key, not the thumbnail filename
+                        filename, thumbnail_key = created
                         thumbnails[filename] = thumbnail_key
-                        
                         created_count += 1
-                        print(f"Created thumbnail: {thumbnail_key} for {filename}")
-                    else:
-                        print(f"Error creating thumbnail for {source_key}: {thumbnail_result['error']}")
-                    
-                except Exception as e:
-                    print(f"Error creating thumbnail for {source_key}: {str(e)}")
-        
-        print(f"After creation - Source images: {list(source_images.keys())}")
-        print(f"After creation - Thumbnails: {list(thumbnails.keys())}")
         
         # Delete orphaned thumbnails
-        deleted_count = 0
-        for thumbnail_filename, thumbnail_key in thumbnails.items():
-            if thumbnail_filename not in source_images:
-                try:
-                    print(f"Deleting orphaned thumbnail: {thumbnail_key} (source: {thumbnail_filename} not found)")
-                    s3_client.delete_object(
-                        Bucket=bucket_name,
-                        Key=thumbnail_key
-                    )
-                    deleted_count += 1
-                    print(f"Deleted orphaned thumbnail: {thumbnail_key}")
-                except Exception as e:
-                    print(f"Error deleting thumbnail {thumbnail_key}: {str(e)}")
-            else:
-                print(f"Keeping thumbnail: {thumbnail_key} (source: {thumbnail_filename} exists)")
+        orphans = []
+        for thumbnail_filename in thumbnails.keys() - source_images.keys():
+            thumbnail_key = thumbnails[thumbnail_filename]
+            print(f"Deleting orphaned thumbnail: {thumbnail_key} (source: {thumbnail_filename} not found)")
+            orphans.append(thumbnail_key)
+        
+        deleted_count = _delete_thumbs(bucket_name, orphans) if orphans else 0
         
         print("=== THUMBNAIL SYNC FUNCTION COMPLETED ===")
         return {
@@ -18,25 +18,19 @@ def handler(event, context):
         
         # Run all four models: ModelA, ModelB, ModelC, ModelD
         models = ['ModelA', 'ModelB', 'ModelC', 'ModelD']
-        results = []
         
-        for model_name in models:
-            logger.info(f"Triggering {model_name} comparison")
-            
-            response = lambda_client.invoke(
-                FunctionName=function_name,
-                InvocationType='Event',
-                Payload=json.dumps({
-                    'model_name': model_name
-                })
-            )
-            
-            results.append({
-                'model': model_name,
-                'status': 'triggered'
+        # One asynchronous invoke for the whole batch; the comparison function shares a single
+        # download, decode and preprocessing pass between the models
+        logger.info(f"Triggering {', '.join(models)} comparison")
+        lambda_client.invoke(
+            FunctionName=function_name,
+            InvocationType='Event',
+            Payload=json.dumps({
+                'model_names': models
             })
-            
-            logger.info(f"Successfully triggered {model_name} comparison")
+        )
+        
+        results = [{'model': model_name, 'status': 'triggered'} for model_name in models]
         
         logger.info(f"Successfully triggered all {len(models)} comparison models")
         
@@ -1,15 +1,17 @@
-import boto3
 import json
 import base64
 import os
 import logging
-from datetime import datetime
-from PIL import Image
+from aws_clients import make_s3_client
+from datetime import datetime, timezone
 import io
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
-s3_client = boto3.client('s3')
+s3_client = make_s3_client()
+
+# Rows cropped off the top of each upload; 0 disables cropping, and with it the PIL import
+CROP_TOP_PX = int(os.environ.get('CROP_TOP_PX', '35'))
 
 def handler(event, context):
     try:
@@ -31,45 +33,54 @@ def handler(event, context):
         else:
             # Raw binary data - handle properly
             if isinstance(body, str):
-                # If it's a string, it might be binary data that was incorrectly interpreted
-                # Try to handle it as binary data
-                try:
-                    image_bytes = body.encode('latin-1')
-                    logger.info(f"Converted string to bytes, size: {len(image_bytes)} bytes")
-                except UnicodeEncodeError:
-                    # If latin-1 encoding fails, treat as raw bytes
-                    image_bytes = body.encode('utf-8', errors='ignore')
-                    logger.info(f"Converted string to bytes with utf-8 fallback, size: {len(image_bytes)} bytes")
+                # image/* uploads arrive base64 encoded (binary media types on the API), so a
+                # text body means the client sent another Content-Type and API Gateway has
+                # already decoded the bytes as text; re-encoding cannot recover the JPEG
+                logger.warning("Rejecting text body that was not base64 encoded; send Content-Type: image/jpeg")
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*',
+                        'Access-Control-Allow-Headers': 'Content-Type',
+                        'Access-Control-Allow-Methods': 'POST,OPTIONS'
+                    },
+                    'body': json.dumps({'error': 'Expected a binary image body (Content-Type: image/jpeg)'})
+                }
             else:
                 image_bytes = body
                 logger.info(f"Using raw body, size: {len(image_bytes)} bytes")
         
-        # Crop the upper 35px from the image
-        logger.info("Starting image cropping - removing upper 35px")
-        try:
-            # Open image from bytes
-            image = Image.open(io.BytesIO(image_bytes))
-            logger.info(f"Original image size: {image.size}")
-            
-            # Get image dimensions
-            width, height = image.size
-            
-            # Crop: remove upper 35px (crop from (0,35) to (width, height))
-            if height > 35:
-                cropped_image = image.crop((0, 35, width, height))
-                logger.info(f"Cropped image size: {cropped_image.size}")
+        # Crop the upper CROP_TOP_PX rows from the image
+        if CROP_TOP_PX > 0:
+            logger.info(f"Starting image cropping - removing upper {CROP_TOP_PX}px")
+            try:
+                # Imported here so deployments without cropping skip loading PIL on cold start
+                from PIL import Image
                 
-                # Convert back to bytes
-                output_buffer = io.BytesIO()
-                cropped_image.save(output_buffer, format='JPEG', quality=95)
-                image_bytes = output_buffer.getvalue()
-                logger.info(f"Cropped image size: {len(image_bytes)} bytes")
-            else:
-                logger.warning(f"Image height ({height}px) is less than or equal to crop amount (35px), skipping crop")
+                # Open image from bytes
+                image = Image.open(io.BytesIO(image_bytes))
+                logger.info(f"Original image size: {image.size}")
+                
+                # Get image dimensions
+                width, height = image.size
                 
-        except Exception as crop_error:
-            logger.error(f"Error during cropping: {str(crop_error)}")
-            logger.info("Continuing with original image without cropping")
+                # Crop: remove upper rows (crop from (0,CROP_TOP_PX) to (width, height))
+                if height > CROP_TOP_PX:
+                    cropped_image = image.crop((0, CROP_TOP_PX, width, height))
+                    logger.info(f"Cropped image size: {cropped_image.size}")
+                    
+                    # Convert back to bytes
+                    output_buffer = io.BytesIO()
+                    cropped_image.save(output_buffer, format='JPEG', quality=95)
+                    image_bytes = output_buffer.getvalue()
+                    logger.info(f"Cropped image size: {len(image_bytes)} bytes")
+                else:
+                    logger.warning(f"Image height ({height}px) is less than or equal to crop amount ({CROP_TOP_PX}px), skipping crop")
+                    
+            except Exception as crop_error:
+                logger.error(f"Error during cropping: {str(crop_error)}")
+                logger.info("Continuing with original image without cropping")
         
         # Upload to S3 in the uploads folder
         logger.info(f"Uploading to S3: {bucket_name}/uploads/latest.jpg")
@@ -80,7 +91,7 @@ def handler(event, context):
             ContentType='image/jpeg',
             CacheControl='no-store',  # Simple and robust
             Metadata={
-                'uploaded-at': datetime.now().isoformat()
+                'uploaded-at': datetime.now(timezone.utc).isoformat(timespec='seconds')
             }
         )
         logger.info("Upload completed successfully")
@@ -0,0 +1,44 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+
+from model_common import diff_and_mark
+
+
+class DiffAndMarkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.latest = np.arange(12, dtype=np.uint8).reshape(3, 4) * 20
+        self.median = self.latest.copy()
+
+    def test_no_difference_returns_rgb_by_default(self):
+        different_pixels, vis_array = diff_and_mark(self.latest, self.median, 10)
+
+        self.assertEqual(different_pixels, 0)
+        self.assertEqual(vis_array.shape, (3, 4, 3))
+        for channel in range(3):
+            np.testing.assert_array_equal(vis_array[..., channel], self.latest)
+
+    def test_no_difference_returns_gray_when_requested(self):
+        different_pixels, vis_array = diff_and_mark(self.latest, self.median, 10, gray_if_unchanged=True)
+
+        self.assertEqual(different_pixels, 0)
+        self.assertIs(vis_array, self.latest)
+
+    def test_differing_pixels_are_marked_yellow(self):
+        self.median[0, 0] = self.latest[0, 0] + 11
+        self.median[1, 1] = self.latest[1, 1] + 10
+
+        different_pixels, vis_array = diff_and_mark(self.latest, self.median, 10, gray_if_unchanged=True)
+
+        self.assertEqual(different_pixels, 1)
+        np.testing.assert_array_equal(vis_array[0, 0], [255, 255, 0])
+        np.testing.assert_array_equal(vis_array[1, 1], [self.latest[1, 1]] * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()